@@ -0,0 +1,43 @@
+import time
+from hashlib import md5
+
+from django.core.cache import cache
+
+CACHE_VERSION_KEY_TEMPLATE = 'version:{namespace}'
+
+
+def get_initial_cache_version():
+    return int(time.time() * 1000)
+
+
+def get_cache_versions(namespaces):
+    keys = {
+        CACHE_VERSION_KEY_TEMPLATE.format(namespace=namespace): namespace
+        for namespace in namespaces
+    }
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        cache.add(key, get_initial_cache_version(), None)
+        versions[key] = cache.get(key)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def bump_cache_version(namespace):
+    key = CACHE_VERSION_KEY_TEMPLATE.format(namespace=namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, get_initial_cache_version(), None)
+
+
+def make_cache_key(prefix, *parts):
+    digest = md5('|'.join(map(str, parts)).encode('utf-8')).hexdigest()
+    return f'{prefix}:{digest}'
+
+
+def normalize_query_params(query_params, excluded=()):
+    return sorted(
+        (key, sorted(query_params.getlist(key)))
+        for key in query_params
+        if key not in excluded
+    )
@@ -0,0 +1,16 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from interactions_with_recipes.models import Favorite, ShoppingList
+
+RECIPE_COUNTER_FIELDS = {
+    Favorite: 'favorites_count',
+    ShoppingList: 'shopping_count',
+}
+
+
+def change_counter(model, pks, field, delta):
+    value = F(field) + delta
+    if delta < 0:
+        value = Greatest(value, 0)
+    return model.objects.filter(pk__in=pks).update(**{field: value})
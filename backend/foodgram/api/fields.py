@@ -0,0 +1,92 @@
+import binascii
+from base64 import b64decode
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework import serializers
+
+
+class StreamingBase64ImageField(Base64ImageField):
+    CHUNK_SIZE = 64 * 1024
+    default_error_messages = {
+        'max_size': 'Размер картинки не должен превышать {max_size} байт',
+    }
+
+    def to_internal_value(self, base64_data):
+        if base64_data in self.EMPTY_VALUES:
+            return None
+        if not isinstance(base64_data, str):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        content_type = None
+        if ';base64,' in base64_data:
+            header, base64_data = base64_data.split(';base64,', 1)
+            if self.trust_provided_content_type:
+                content_type = header.replace('data:', '')
+        max_size = settings.RECIPE_IMAGE_MAX_SIZE
+        if len(base64_data) // 4 * 3 > max_size + 2:
+            self.fail('max_size', max_size=max_size)
+        decoded_file, size = self.decode(base64_data, max_size)
+        decoded_file.seek(0)
+        head = decoded_file.read(self.CHUNK_SIZE)
+        decoded_file.seek(0)
+        file_name = self.get_file_name(head)
+        file_extension = self.get_file_extension(file_name, head)
+        if file_extension not in self.ALLOWED_TYPES:
+            raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+        return serializers.ImageField.to_internal_value(
+            self,
+            InMemoryUploadedFile(
+                decoded_file,
+                None,
+                f'{file_name}.{file_extension}',
+                content_type,
+                size,
+                None,
+            ),
+        )
+
+    def decode(self, base64_data, max_size):
+        decoded_file = SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        size = 0
+        for start in range(0, len(base64_data), self.CHUNK_SIZE):
+            try:
+                chunk = b64decode(
+                    base64_data[start:start + self.CHUNK_SIZE], validate=True
+                )
+            except (TypeError, binascii.Error, ValueError):
+                raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+            size += len(chunk)
+            if size > max_size:
+                self.fail('max_size', max_size=max_size)
+            decoded_file.write(chunk)
+        return decoded_file, size
+
+
+class ImageUrlField(serializers.Field):
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, image):
+        if not image:
+            return None
+        request = self.context.get('request')
+        if request is None:
+            return image.url
+        return request.build_absolute_uri(image.url)
+
+
+class ImageRenditionField(ImageUrlField):
+    def __init__(self, rendition, **kwargs):
+        self.rendition = rendition
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        return super().to_representation(
+            getattr(recipe, self.rendition) or recipe.image
+        )
@@ -1,9 +1,19 @@
-from django_filters.rest_framework import (BooleanFilter, FilterSet,
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramSimilarity)
+from django.db import connections
+from django.db.models import F, Q
+from django_filters.rest_framework import (BooleanFilter, CharFilter,
+                                           ChoiceFilter, FilterSet,
                                            ModelMultipleChoiceFilter)
-from rest_framework.filters import SearchFilter
 
 from recipes.models import Recipe, Tag
 
+SEARCH_CONFIG = 'russian'
+RECIPE_ORDERINGS = {
+    'popular': ('-favorites_count', '-pub_date'),
+    'trending': ('-trending_score', '-pub_date'),
+}
+
 
 class RecipeFilter(FilterSet):
     tags = ModelMultipleChoiceFilter(
@@ -13,6 +23,11 @@ class RecipeFilter(FilterSet):
     )
     is_favorited = BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = BooleanFilter(method='filter_is_in_shopping_cart')
+    search = CharFilter(method='filter_search')
+    ordering = ChoiceFilter(
+        choices=tuple((ordering, ordering) for ordering in RECIPE_ORDERINGS),
+        method='filter_ordering',
+    )
 
     class Meta:
         model = Recipe
@@ -30,15 +45,18 @@ class RecipeFilter(FilterSet):
             return queryset.filter(shoppinglist__user=user)
         return queryset
 
-
-class IngredientSearchFilter(SearchFilter):
-    def get_search_fields(self, view, request):
-        if request.query_params.get('name'):
-            return ('^name',)
-        return super().get_search_fields(view, request)
-
-    def get_search_terms(self, request):
-        if request.query_params.get('name'):
-            searched_name = request.query_params.get('name')
-            return (searched_name,)
-        return super().get_search_terms(request)
+    def filter_search(self, queryset, name, value):
+        if connections[queryset.db].vendor != 'postgresql':
+            return queryset.filter(
+                Q(name__icontains=value) | Q(text__icontains=value)
+            )
+        search_query = SearchQuery(value, config=SEARCH_CONFIG)
+        return queryset.annotate(
+            search_rank=SearchRank(F('search_vector'), search_query),
+            name_similarity=TrigramSimilarity('name', value),
+        ).filter(
+            Q(search_vector=search_query) | Q(name__trigram_similar=value)
+        ).order_by('-search_rank', '-name_similarity', '-pub_date')
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
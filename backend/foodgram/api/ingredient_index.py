@@ -0,0 +1,69 @@
+import time
+from bisect import bisect_left
+from threading import Lock
+
+from django.conf import settings
+
+from api.cache import get_cache_versions
+from recipes.models import Ingredient
+
+INGREDIENTS_CACHE_NAMESPACE = 'ingredients'
+MAX_CHARACTER = chr(0x10FFFF)
+
+
+class IngredientIndex:
+    def __init__(self):
+        self.lock = Lock()
+        self.version = None
+        self.loaded_at = None
+        self.entries = ((), ())
+
+    def load(self, version=None):
+        ingredients = sorted(
+            Ingredient.objects.values('id', 'name', 'measurement_unit'),
+            key=lambda ingredient: (
+                ingredient['name'].lower(), ingredient['id']
+            ),
+        )
+        self.entries = (
+            tuple(ingredient['name'].lower() for ingredient in ingredients),
+            tuple(ingredients),
+        )
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+    def is_stale(self, version):
+        return (
+            self.loaded_at is None
+            or self.version != version
+            or time.monotonic() - self.loaded_at
+            > settings.INGREDIENT_INDEX_TIMEOUT
+        )
+
+    def refresh(self):
+        version = get_cache_versions(
+            (INGREDIENTS_CACHE_NAMESPACE,)
+        )[INGREDIENTS_CACHE_NAMESPACE]
+        if self.is_stale(version):
+            with self.lock:
+                if self.is_stale(version):
+                    self.load(version)
+
+    def search(self, query, limit=None):
+        self.refresh()
+        if limit is None:
+            limit = settings.INGREDIENT_SEARCH_LIMIT
+        query = query.lower()
+        keys, ingredients = self.entries
+        start = bisect_left(keys, query)
+        end = bisect_left(keys, query + MAX_CHARACTER, start)
+        found = list(ingredients[start:min(end, start + limit)])
+        for index, key in enumerate(keys):
+            if len(found) >= limit:
+                break
+            if query in key and not start <= index < end:
+                found.append(ingredients[index])
+        return found
+
+
+ingredient_index = IngredientIndex()
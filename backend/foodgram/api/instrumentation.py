@@ -0,0 +1,53 @@
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = Counter()
+        self.timings = defaultdict(float)
+        self.active_timers = set()
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.timings['db'] += time.perf_counter() - started
+            self.queries[sql] += 1
+
+    def get_duplicated_queries(self, limit):
+        return [
+            (sql, count) for sql, count in self.queries.most_common(limit)
+            if count > 1
+        ]
+
+
+@contextmanager
+def timer(name):
+    metrics = current_metrics.get()
+    if metrics is None or name in metrics.active_timers:
+        yield
+        return
+    metrics.active_timers.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - started
+        metrics.active_timers.discard(name)
+
+
+class TimedSerializerMixin:
+    @property
+    def data(self):
+        with timer('serializer'):
+            return super().data
@@ -0,0 +1,105 @@
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+HISTOGRAMS = {
+    'http_request_duration_seconds': (
+        'Request duration',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    'http_request_db_queries': (
+        'Database queries per request',
+        (1, 2, 3, 5, 10, 20, 50, 100, 200),
+    ),
+    'http_request_db_duration_seconds': (
+        'Time spent in the database per request',
+        (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    ),
+    'http_request_serializer_duration_seconds': (
+        'Time spent serializing per request',
+        (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    ),
+    'http_response_size_bytes': (
+        'Response body size',
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    ),
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = Lock()
+        self.histograms = defaultdict(dict)
+
+    def observe(self, name, labels, value):
+        labels = tuple(sorted(labels.items()))
+        with self.lock:
+            histogram = self.histograms[name].get(labels)
+            if histogram is None:
+                histogram = self.histograms[name][labels] = Histogram(
+                    HISTOGRAMS[name][1]
+                )
+            histogram.observe(value)
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for name, (description, _) in HISTOGRAMS.items():
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histogram in sorted(
+                    self.histograms[name].items()
+                ):
+                    lines.extend(render_histogram(name, labels, histogram))
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    return ','.join(
+        '{}="{}"'.format(
+            key, str(value).replace('\\', '\\\\').replace('"', '\\"')
+        )
+        for key, value in labels
+    )
+
+
+def render_histogram(name, labels, histogram):
+    label_text = format_labels(labels)
+    cumulative = 0
+    for bucket, count in zip(
+        (*histogram.buckets, '+Inf'), histogram.counts
+    ):
+        cumulative += count
+        bucket_labels = format_labels((*labels, ('le', bucket)))
+        yield f'{name}_bucket{{{bucket_labels}}} {cumulative}'
+    yield f'{name}_sum{{{label_text}}} {histogram.total}'
+    yield f'{name}_count{{{label_text}}} {cumulative}'
+
+
+registry = MetricsRegistry()
+
+
+def is_metrics_client(request):
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def metrics_view(request):
+    if not is_metrics_client(request):
+        raise Http404
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
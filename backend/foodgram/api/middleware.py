@@ -0,0 +1,96 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from api.instrumentation import RequestMetrics, current_metrics
+from api.metrics import is_metrics_client, registry
+
+logger = logging.getLogger(__name__)
+
+
+class RequestInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.record_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        duration = time.perf_counter() - started
+        if settings.SERVER_TIMING or is_metrics_client(request):
+            response['Server-Timing'] = self.get_server_timing(
+                metrics, duration
+            )
+        self.observe(request, response, metrics, duration)
+        self.check_budgets(request, metrics, duration)
+        return response
+
+    @staticmethod
+    def get_route(request):
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is None:
+            return 'unmatched'
+        return resolver_match.view_name
+
+    @staticmethod
+    def get_server_timing(metrics, duration):
+        return ', '.join((
+            f'db;dur={metrics.timings["db"] * 1000:.2f};'
+            f'desc="{metrics.query_count} queries"',
+            f'serializer;dur={metrics.timings["serializer"] * 1000:.2f}',
+            f'total;dur={duration * 1000:.2f}',
+        ))
+
+    def observe(self, request, response, metrics, duration):
+        labels = {'route': self.get_route(request), 'method': request.method}
+        registry.observe('http_request_duration_seconds', labels, duration)
+        registry.observe(
+            'http_request_db_queries', labels, metrics.query_count
+        )
+        registry.observe(
+            'http_request_db_duration_seconds', labels, metrics.timings['db']
+        )
+        registry.observe(
+            'http_request_serializer_duration_seconds',
+            labels,
+            metrics.timings['serializer'],
+        )
+        if not response.streaming:
+            registry.observe(
+                'http_response_size_bytes', labels, len(response.content)
+            )
+
+    def check_budgets(self, request, metrics, duration):
+        if (
+            metrics.query_count <= settings.REQUEST_QUERY_BUDGET
+            and duration <= settings.REQUEST_DURATION_BUDGET
+        ):
+            return
+        logger.warning(
+            '%s %s (%s) took %.1f ms and %d queries (%.1f ms in the '
+            'database), top duplicated queries:%s',
+            request.method,
+            request.get_full_path(),
+            self.get_route(request),
+            duration * 1000,
+            metrics.query_count,
+            metrics.timings['db'] * 1000,
+            ''.join(
+                f'\n  {count} x {sql}'
+                for sql, count in metrics.get_duplicated_queries(
+                    settings.REQUEST_BUDGET_DUPLICATED_QUERIES
+                )
+            ) or ' none',
+        )
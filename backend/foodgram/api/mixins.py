@@ -0,0 +1,80 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+
+from api.cache import (get_cache_versions, make_cache_key,
+                       normalize_query_params)
+
+
+class AnonymousResponseCacheMixin:
+    response_cache_namespaces = ()
+    response_cache_anonymous_only = True
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def is_response_cacheable(self, request):
+        return request.method == 'GET' and (
+            request.user.is_anonymous
+            or not self.response_cache_anonymous_only
+        )
+
+    def get_response_cache_key(self, request):
+        versions = get_cache_versions(self.response_cache_namespaces)
+        return make_cache_key(
+            'response',
+            request.get_host(),
+            request.path,
+            request.accepted_renderer.format,
+            normalize_query_params(request.query_params),
+            sorted(versions.items()),
+        )
+
+    def render_response(self, response):
+        response.accepted_renderer = self.request.accepted_renderer
+        response.accepted_media_type = self.request.accepted_media_type
+        response.renderer_context = self.get_renderer_context()
+        response.render()
+        return (
+            response.content,
+            response['Content-Type'],
+            f'"{md5(response.content).hexdigest()}"',
+        )
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if not self.is_response_cacheable(request):
+            return handler(request, *args, **kwargs)
+        cache_key = self.get_response_cache_key(request)
+        cached_response = cache.get(cache_key)
+        if cached_response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            cached_response = self.render_response(response)
+            cache.set(
+                cache_key, cached_response, settings.RESPONSE_CACHE_TIMEOUT
+            )
+        content, content_type, etag = cached_response
+        if self.is_not_modified(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = etag
+        return response
+
+    @staticmethod
+    def is_not_modified(request, etag):
+        if_none_match = {
+            value.strip().replace('W/', '', 1)
+            for value in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')
+        }
+        return etag in if_none_match or '*' in if_none_match
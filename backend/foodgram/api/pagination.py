@@ -1,5 +1,178 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from api.cache import (get_cache_versions, make_cache_key,
+                       normalize_query_params)
+
+
+class CachedCountPaginator(Paginator):
+    def __init__(self, *args, cache_key=None, count_queryset=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_key = cache_key
+        self.count_queryset = count_queryset
+
+    def get_count(self):
+        if self.count_queryset is None:
+            return super().count
+        return self.count_queryset.count()
+
+    @cached_property
+    def count(self):
+        if self.cache_key is None:
+            return self.get_count()
+        count = cache.get(self.cache_key)
+        if count is None:
+            count = self.get_count()
+            cache.set(
+                self.cache_key,
+                count,
+                settings.PAGINATION_COUNT_CACHE_TIMEOUT,
+            )
+        return count
+
+
+class UncountedPaginator(Paginator):
+    count = None
+    num_pages = None
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not object_list and number > 1:
+            raise EmptyPage('That page contains no results')
+        self.num_pages = (
+            number + 1 if len(object_list) > self.per_page else number
+        )
+        return self._get_page(object_list[:self.per_page], number, self)
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.count_query_param) == 'false':
+            self.django_paginator_class = UncountedPaginator
+        else:
+            self.django_paginator_class = partial(
+                CachedCountPaginator,
+                cache_key=self.get_count_cache_key(request, view),
+                count_queryset=getattr(view, 'count_queryset', None),
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count_cache_key(self, request, view=None):
+        get_namespaces = getattr(view, 'get_count_cache_namespaces', None)
+        if get_namespaces is None:
+            return None
+        namespaces = get_namespaces()
+        if namespaces is None:
+            return None
+        namespaces = sorted(namespaces)
+        versions = get_cache_versions(namespaces)
+        return make_cache_key(
+            'count',
+            request.path,
+            normalize_query_params(
+                request.query_params,
+                excluded=(
+                    self.page_query_param,
+                    self.page_size_query_param,
+                    self.count_query_param,
+                ),
+            ),
+            [(namespace, versions[namespace]) for namespace in namespaces],
+        )
+
+
+class RecipeCursorPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = 6
+    ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+    unsupported_ordering_message = (
+        'Cursor pagination only supports ordering by publication date'
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if queryset.query.order_by:
+            raise ValidationError(
+                {self.cursor_query_param: self.unsupported_ordering_message}
+            )
+        page_size = self.get_page_size(request)
+        self.request = request
+        queryset = queryset.order_by(*self.ordering)
+        encoded_cursor = request.query_params.get(self.cursor_query_param)
+        if encoded_cursor:
+            pub_date, pk = self.decode_cursor(encoded_cursor)
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )
+        page = list(queryset[:page_size + 1])
+        self.has_next = len(page) > page_size
+        self.page = page[:page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return page_size if page_size > 0 else self.page_size
+
+    def decode_cursor(self, encoded_cursor):
+        try:
+            pub_date, pk = urlsafe_b64decode(
+                encoded_cursor.encode('ascii')
+            ).decode('ascii').split('|')
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
+
+    def encode_cursor(self, recipe):
+        return urlsafe_b64encode(
+            f'{recipe.pub_date.isoformat()}|{recipe.pk}'.encode('ascii')
+        ).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1]),
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict((
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        )))
@@ -0,0 +1,13 @@
+from rest_framework.parsers import FileUploadParser
+
+
+class ImageUploadParser(FileUploadParser):
+    media_type = 'image/*'
+    default_filename = 'image'
+
+    def get_filename(self, stream, media_type, parser_context):
+        filename = super().get_filename(stream, media_type, parser_context)
+        if filename:
+            return filename
+        subtype = media_type.split(';')[0].split('/')[-1].strip()
+        return f'{self.default_filename}.{subtype}'
@@ -0,0 +1,159 @@
+from collections import defaultdict
+
+from django.db.models import (BooleanField, Count, Exists, F, FloatField,
+                              OuterRef, Prefetch, Q, Sum, Value, Window)
+from django.db.models.functions import Cast, RowNumber
+
+from interactions_with_recipes.models import Favorite, ShoppingList
+from recipes.models import IngredientRecipe, Recipe
+from users.models import Follow, User
+
+
+def annotate_is_subscribed(queryset, user):
+    if user.is_anonymous:
+        return queryset.annotate(
+            is_subscribed=Value(False, output_field=BooleanField())
+        )
+    return queryset.annotate(
+        is_subscribed=Exists(
+            Follow.objects.filter(user=user, following=OuterRef('pk'))
+        )
+    )
+
+
+def annotate_recipe_flags(queryset, user):
+    if user.is_anonymous:
+        return queryset.annotate(
+            is_favorited=Value(False, output_field=BooleanField()),
+            is_in_shopping_cart=Value(False, output_field=BooleanField()),
+        )
+    return queryset.annotate(
+        is_favorited=Exists(
+            Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+        ),
+        is_in_shopping_cart=Exists(
+            ShoppingList.objects.filter(user=user, recipe=OuterRef('pk'))
+        ),
+    )
+
+
+def get_recipes_with_related(user):
+    return Recipe.objects.defer('search_vector').prefetch_related(
+        Prefetch(
+            'author',
+            queryset=annotate_is_subscribed(User.objects.all(), user),
+        ),
+        'tags',
+        Prefetch(
+            'ingredientrecipe_set',
+            queryset=IngredientRecipe.objects.select_related('ingredient'),
+        ),
+    )
+
+
+def get_recipes_for_read(user):
+    return annotate_recipe_flags(get_recipes_with_related(user), user)
+
+
+def get_recipes_for_list(user):
+    recipes = annotate_recipe_flags(
+        Recipe.objects.only('id', 'author_id', 'pub_date', 'updated_at'),
+        user,
+    )
+    if user.is_anonymous:
+        return recipes.annotate(
+            is_author_subscribed=Value(False, output_field=BooleanField())
+        )
+    return recipes.annotate(
+        is_author_subscribed=Exists(
+            Follow.objects.filter(user=user, following=OuterRef('author_id'))
+        )
+    )
+
+
+def filter_by_ingredients(recipes, ingredient_ids):
+    return recipes.filter(
+        pk__in=IngredientRecipe.objects.filter(
+            ingredient_id__in=ingredient_ids
+        ).values('recipe_id')
+    )
+
+
+def get_ingredient_coverage(recipes, ingredient_ids):
+    return recipes.values('pk').annotate(
+        matched_ingredients=Count(
+            'ingredientrecipe',
+            distinct=True,
+            filter=Q(ingredientrecipe__ingredient_id__in=ingredient_ids),
+        ),
+        total_ingredients=Count('ingredientrecipe', distinct=True),
+    ).annotate(
+        coverage=Cast('matched_ingredients', FloatField())
+        / Cast('total_ingredients', FloatField())
+    ).order_by('-coverage', '-matched_ingredients', '-pub_date', '-pk')
+
+
+def get_recipes_with_coverage(coverages, user):
+    recipes = get_recipes_for_read(user).in_bulk(
+        [coverage['pk'] for coverage in coverages]
+    )
+    recipes_with_coverage = []
+    for coverage in coverages:
+        recipe = recipes.get(coverage['pk'])
+        if recipe is None:
+            continue
+        recipe.matched_ingredients = coverage['matched_ingredients']
+        recipe.total_ingredients = coverage['total_ingredients']
+        recipe.coverage = coverage['coverage']
+        recipes_with_coverage.append(recipe)
+    return recipes_with_coverage
+
+
+def get_subscriptions(user):
+    return annotate_is_subscribed(
+        User.objects.filter(subscribers__user=user), user
+    ).order_by('pk')
+
+
+def get_latest_recipes_by_author(author_ids, limit=None):
+    recipes = Recipe.objects.filter(author_id__in=author_ids).only(
+        'id', 'author_id', 'name', 'image', 'image_thumbnail', 'cooking_time',
+    )
+    if limit is None:
+        return recipes
+    ranked_recipes = recipes.annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=F('pub_date').desc(),
+        )
+    ).order_by()
+    sql, params = ranked_recipes.query.sql_with_params()
+    return Recipe.objects.raw(
+        f'SELECT * FROM ({sql}) AS ranked_recipes '
+        'WHERE ranked_recipes.row_number <= %s '
+        'ORDER BY ranked_recipes.author_id, ranked_recipes.row_number',
+        (*params, limit),
+    )
+
+
+def attach_latest_recipes(authors, limit=None):
+    if not authors:
+        return authors
+    recipes_by_author = defaultdict(list)
+    for recipe in get_latest_recipes_by_author(
+            [author.pk for author in authors], limit
+    ):
+        recipes_by_author[recipe.author_id].append(recipe)
+    for author in authors:
+        author.latest_recipes = recipes_by_author[author.pk]
+    return authors
+
+
+def get_shopping_cart_ingredients(user):
+    return IngredientRecipe.objects.filter(
+        recipe__shoppinglist__user=user
+    ).values(
+        name=F('ingredient__name'),
+        measurement_unit=F('ingredient__measurement_unit'),
+    ).annotate(amount=Sum('amount')).order_by('name')
@@ -0,0 +1,59 @@
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class ShoppingCartTextRenderer(BaseRenderer):
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return '\n'.join(
+                f'{key}: {value}' for key, value in data.items()
+            ).encode(self.charset)
+        return ''.join(self.stream(data)).encode(self.charset)
+
+    def stream(self, ingredients):
+        raise NotImplementedError
+
+
+class ShoppingCartCSVRenderer(ShoppingCartTextRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        for ingredient in ingredients:
+            yield writer.writerow((
+                f'название: {ingredient["name"]}',
+                f'количество: {ingredient["amount"]}',
+                f'единицы измерения: {ingredient["measurement_unit"]}',
+            ))
+
+
+class ShoppingCartTXTRenderer(ShoppingCartTextRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        for ingredient in ingredients:
+            yield (
+                f'{ingredient["name"]} ({ingredient["measurement_unit"]}) '
+                f'— {ingredient["amount"]}\n'
+            )
+
+
+class ShoppingCartJSONRenderer(JSONRenderer):
+    def stream(self, ingredients):
+        yield '['
+        for index, ingredient in enumerate(ingredients):
+            if index:
+                yield ','
+            yield json.dumps(ingredient, ensure_ascii=False)
+        yield ']'
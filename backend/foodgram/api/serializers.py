@@ -1,13 +1,31 @@
+import os
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer, UserSerializer
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+from api.cache import get_cache_versions, make_cache_key
+from api.fields import (ImageRenditionField, ImageUrlField,
+                        StreamingBase64ImageField)
+from api.ingredient_index import INGREDIENTS_CACHE_NAMESPACE
+from api.instrumentation import TimedSerializerMixin
+from api.querysets import get_recipes_for_read
 from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag, TagRecipe
 from users.models import User
 
 
-class CustomUserSerializer(UserSerializer):
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class CustomUserSerializer(TimedSerializerMixin, UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -16,8 +34,11 @@ class CustomUserSerializer(UserSerializer):
             'email', 'id', 'username',
             'first_name', 'last_name', 'is_subscribed',
         )
+        list_serializer_class = TimedListSerializer
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         current_user = self.context['request'].user
         return (not current_user.is_anonymous
                 and current_user.subscriptions.filter(following=obj).exists())
@@ -43,9 +64,75 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit')
 
 
+def get_objects_in_bulk(queryset, pks, message):
+    objects = queryset.in_bulk(set(pks))
+    missing_pks = [pk for pk in dict.fromkeys(pks) if pk not in objects]
+    if missing_pks:
+        raise ValidationError(
+            message.format(pks=', '.join(map(str, missing_pks)))
+        )
+    return objects
+
+
+class ManyBulkRelatedField(serializers.ManyRelatedField):
+    def to_internal_value(self, data):
+        pks = super().to_internal_value(data)
+        objects = get_objects_in_bulk(
+            self.child_relation.get_queryset(),
+            pks,
+            self.child_relation.error_messages['do_not_exist'],
+        )
+        return [objects[pk] for pk in pks]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    default_error_messages = {
+        'do_not_exist': 'Объекты с id {pks} не существуют',
+    }
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return ManyBulkRelatedField(**list_kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class IngredientRecipeListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        ingredientrecipe_set = super().to_internal_value(data)
+        id_field = self.child.fields['id']
+        ingredients = get_objects_in_bulk(
+            id_field.get_queryset(),
+            [
+                ingredient_recipe['ingredient']['id']
+                for ingredient_recipe in ingredientrecipe_set
+            ],
+            id_field.error_messages['do_not_exist'],
+        )
+        for ingredient_recipe in ingredientrecipe_set:
+            ingredient_recipe['ingredient']['id'] = ingredients[
+                ingredient_recipe['ingredient']['id']
+            ]
+        return ingredientrecipe_set
+
+
 class IngredientRecipeSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        source='ingredient.id', queryset=Ingredient.objects.all()
+    id = BulkPrimaryKeyRelatedField(
+        source='ingredient.id',
+        queryset=Ingredient.objects.all(),
+        error_messages={
+            'do_not_exist': 'Ингредиенты с id {pks} не существуют',
+        },
     )
     name = serializers.ReadOnlyField(
         source='ingredient.name'
@@ -57,15 +144,84 @@ class IngredientRecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = IngredientRecipe
         fields = ('id', 'name', 'measurement_unit', 'amount')
+        list_serializer_class = IngredientRecipeListSerializer
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadListSerializer(TimedListSerializer):
+    fragment_cache_namespaces = (
+        'tags', INGREDIENTS_CACHE_NAMESPACE, 'user_profiles',
+    )
+
+    def get_fragment_cache_keys(self, recipes):
+        versions = get_cache_versions(self.fragment_cache_namespaces)
+        host = self.context['request'].get_host()
+        return {
+            recipe.pk: make_cache_key(
+                'recipe_fragment',
+                host,
+                recipe.pk,
+                recipe.updated_at.isoformat(),
+                sorted(versions.items()),
+            )
+            for recipe in recipes
+        }
+
+    def build_fragments(self, recipe_ids):
+        fragments = {}
+        for recipe in get_recipes_for_read(AnonymousUser()).filter(
+                pk__in=recipe_ids
+        ):
+            fragment = self.child.to_representation(recipe)
+            del fragment['is_favorited'], fragment['is_in_shopping_cart']
+            del fragment['author']['is_subscribed']
+            fragments[recipe.pk] = fragment
+        return fragments
+
+    def get_fragments(self, recipes):
+        cache_keys = self.get_fragment_cache_keys(recipes)
+        cached_fragments = cache.get_many(cache_keys.values())
+        fragments = {
+            recipe_id: cached_fragments[cache_key]
+            for recipe_id, cache_key in cache_keys.items()
+            if cache_key in cached_fragments
+        }
+        missing_fragments = self.build_fragments(
+            cache_keys.keys() - fragments.keys()
+        )
+        cache.set_many(
+            {
+                cache_keys[recipe_id]: fragment
+                for recipe_id, fragment in missing_fragments.items()
+            },
+            settings.RECIPE_FRAGMENT_CACHE_TIMEOUT,
+        )
+        return {**fragments, **missing_fragments}
+
+    def to_representation(self, data):
+        recipes = list(data)
+        fragments = self.get_fragments(recipes)
+        return [
+            {
+                **fragments[recipe.pk],
+                'author': {
+                    **fragments[recipe.pk]['author'],
+                    'is_subscribed': recipe.is_author_subscribed,
+                },
+                'is_favorited': recipe.is_favorited,
+                'is_in_shopping_cart': recipe.is_in_shopping_cart,
+            }
+            for recipe in recipes
+        ]
+
+
+class RecipeReadSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserSerializer(read_only=True)
     ingredients = IngredientRecipeSerializer(
         many=True, source='ingredientrecipe_set', read_only=True,
     )
-    image = Base64ImageField()
+    image = ImageUrlField()
+    image_card = ImageRenditionField('image_card')
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
@@ -73,29 +229,49 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients',
-            'name', 'image', 'text', 'cooking_time',
+            'name', 'image', 'image_card', 'text', 'cooking_time',
             'is_favorited', 'is_in_shopping_cart',
         )
+        list_serializer_class = RecipeReadListSerializer
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         current_user = self.context['request'].user
         return (not current_user.is_anonymous
                 and current_user.favorite_list.filter(recipe=obj).exists())
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         current_user = self.context['request'].user
         return (not current_user.is_anonymous
                 and current_user.shopping_list.filter(recipe=obj).exists())
 
 
-class RecipeCreateUpdateDestroySerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Tag.objects.all()
+class RecipeIngredientCoverageSerializer(RecipeReadSerializer):
+    matched_ingredients = serializers.IntegerField(read_only=True)
+    total_ingredients = serializers.IntegerField(read_only=True)
+    coverage = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeReadSerializer.Meta):
+        list_serializer_class = TimedListSerializer
+        fields = RecipeReadSerializer.Meta.fields + (
+            'matched_ingredients', 'total_ingredients', 'coverage',
+        )
+
+
+class RecipeCreateUpdateDestroySerializer(TimedSerializerMixin,
+                                          serializers.ModelSerializer):
+    tags = BulkPrimaryKeyRelatedField(
+        many=True,
+        queryset=Tag.objects.all(),
+        error_messages={'do_not_exist': 'Теги с id {pks} не существуют'},
     )
     ingredients = IngredientRecipeSerializer(
         many=True, source='ingredientrecipe_set',
     )
-    image = Base64ImageField()
+    image = StreamingBase64ImageField()
 
     class Meta:
         model = Recipe
@@ -108,7 +284,7 @@ class RecipeCreateUpdateDestroySerializer(serializers.ModelSerializer):
     def create_ingredient_recipe_objs(ingredientrecipe_set, recipe):
         IngredientRecipe.objects.bulk_create(
             IngredientRecipe(
-                ingredient_id=ingredient_recipe['ingredient']['id'].id,
+                ingredient=ingredient_recipe['ingredient']['id'],
                 recipe=recipe,
                 amount=ingredient_recipe['amount'],
             ) for ingredient_recipe in ingredientrecipe_set
@@ -123,6 +299,7 @@ class RecipeCreateUpdateDestroySerializer(serializers.ModelSerializer):
             ) for tag in tags
         )
 
+    @transaction.atomic(savepoint=False)
     def create(self, validated_data):
         ingredientrecipe_set = validated_data.pop('ingredientrecipe_set')
         tags = validated_data.pop('tags')
@@ -136,19 +313,77 @@ class RecipeCreateUpdateDestroySerializer(serializers.ModelSerializer):
 
         return recipe
 
+    @staticmethod
+    def update_ingredient_recipe_objs(ingredientrecipe_set, recipe):
+        amounts = {
+            ingredient_recipe['ingredient']['id'].id:
+                ingredient_recipe['amount']
+            for ingredient_recipe in ingredientrecipe_set
+        }
+        existing = {
+            ingredient_recipe.ingredient_id: ingredient_recipe
+            for ingredient_recipe in recipe.ingredientrecipe_set.only(
+                'id', 'ingredient_id', 'recipe_id', 'amount'
+            )
+        }
+        removed = existing.keys() - amounts.keys()
+        if removed:
+            recipe.ingredientrecipe_set.filter(
+                ingredient_id__in=removed
+            ).delete()
+        changed = []
+        for ingredient_id in existing.keys() & amounts.keys():
+            ingredient_recipe = existing[ingredient_id]
+            if ingredient_recipe.amount != amounts[ingredient_id]:
+                ingredient_recipe.amount = amounts[ingredient_id]
+                changed.append(ingredient_recipe)
+        if changed:
+            IngredientRecipe.objects.bulk_update(changed, ('amount',))
+        added = amounts.keys() - existing.keys()
+        if added:
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(
+                    ingredient_id=ingredient_id,
+                    recipe=recipe,
+                    amount=amounts[ingredient_id],
+                ) for ingredient_id in added
+            )
+
+    @staticmethod
+    def update_tag_recipe_objs(tags, recipe):
+        tag_ids = {tag.id for tag in tags}
+        existing = set(recipe.tagrecipe_set.values_list('tag_id', flat=True))
+        removed = existing - tag_ids
+        if removed:
+            recipe.tagrecipe_set.filter(tag_id__in=removed).delete()
+        added = tag_ids - existing
+        if added:
+            TagRecipe.objects.bulk_create(
+                TagRecipe(tag_id=tag_id, recipe=recipe) for tag_id in added
+            )
+
+    @transaction.atomic(savepoint=False)
     def update(self, instance, validated_data):
         if 'ingredients' in self.initial_data:
-            instance.ingredientrecipe_set.all().delete()
             ingredientrecipe_set = validated_data.pop('ingredientrecipe_set')
-            self.create_ingredient_recipe_objs(ingredientrecipe_set, instance)
+            self.update_ingredient_recipe_objs(ingredientrecipe_set, instance)
 
         if 'tags' in self.initial_data:
-            instance.tagrecipe_set.all().delete()
             tags = validated_data.pop('tags')
-            self.create_tag_recipe_objs(tags, instance)
+            self.update_tag_recipe_objs(tags, instance)
 
         return super().update(instance, validated_data)
 
+    def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance],
+            Prefetch(
+                'ingredientrecipe_set',
+                queryset=IngredientRecipe.objects.select_related('ingredient'),
+            ),
+        )
+        return super().to_representation(instance)
+
     def validate_ingredients(self, ingredientrecipe_set):
         unique_ingredients = set()
         for ingredientrecipe in ingredientrecipe_set:
@@ -171,17 +406,43 @@ class RecipeCreateUpdateDestroySerializer(serializers.ModelSerializer):
         return tags
 
 
+class RecipeImageSerializer(serializers.ModelSerializer):
+    image = serializers.ImageField()
+
+    class Meta:
+        model = Recipe
+        fields = ('image',)
+
+    def validate_image(self, image):
+        max_size = settings.RECIPE_IMAGE_MAX_SIZE
+        if image.size > max_size:
+            raise ValidationError(
+                f'Размер картинки не должен превышать {max_size} байт'
+            )
+        image.name = f'{uuid4()}{os.path.splitext(image.name)[1].lower()}'
+        return image
+
+
 class ShortRecipeReadSerializer(serializers.ModelSerializer):
-    image = Base64ImageField()
+    image = ImageUrlField()
+    image_thumbnail = ImageRenditionField('image_thumbnail')
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_thumbnail', 'cooking_time')
         read_only_fields = ('id', 'name', 'image', 'cooking_time')
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_INTERACTIONS_LIMIT,
+    )
+
+
 class UserRecipesSerializer(CustomUserSerializer):
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
     recipes = serializers.SerializerMethodField()
 
     class Meta:
@@ -191,11 +452,13 @@ class UserRecipesSerializer(CustomUserSerializer):
             'first_name', 'last_name', 'is_subscribed',
             'recipes_count', 'recipes',
         )
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        list_serializer_class = TimedListSerializer
 
     def get_recipes(self, obj):
+        if hasattr(obj, 'latest_recipes'):
+            return ShortRecipeReadSerializer(
+                instance=obj.latest_recipes, many=True
+            ).data
         recipes = obj.recipes.all()
         query_params = self.context['request'].query_params
         if 'recipes_limit' in query_params:
@@ -0,0 +1,78 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.cache import bump_cache_version
+from api.ingredient_index import INGREDIENTS_CACHE_NAMESPACE
+from interactions_with_recipes.models import Favorite, ShoppingList
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag, TagRecipe
+from users.models import Follow, User
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=TagRecipe)
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_save, sender=Follow)
+def invalidate_counts_on_create(sender, instance, created, **kwargs):
+    if created:
+        invalidate_counts(sender, instance)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=TagRecipe)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingList)
+@receiver(post_delete, sender=Follow)
+def invalidate_counts_on_delete(sender, instance, **kwargs):
+    invalidate_counts(sender, instance)
+
+
+def invalidate_counts(sender, instance):
+    if sender in {Recipe, TagRecipe}:
+        bump_cache_version('recipes')
+    elif sender is User:
+        bump_cache_version('users')
+    elif sender is Favorite:
+        bump_cache_version(f'favorites:{instance.user_id}')
+    elif sender is ShoppingList:
+        bump_cache_version(f'shopping_list:{instance.user_id}')
+    elif sender is Follow:
+        bump_cache_version(f'follows:{instance.user_id}')
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    bump_cache_version(INGREDIENTS_CACHE_NAMESPACE)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_save, sender=TagRecipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=IngredientRecipe)
+@receiver(post_delete, sender=TagRecipe)
+def invalidate_recipe_content(**kwargs):
+    bump_cache_version('recipe_content')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tags(**kwargs):
+    bump_cache_version('tags')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_profiles(created=False, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        bump_cache_version('user_profiles')
+
+
+def invalidate_recipe_caches():
+    bump_cache_version('recipes')
+    bump_cache_version('recipe_content')
@@ -0,0 +1,110 @@
+from django.db import connections, router
+from django.db.models.signals import post_delete, post_save
+
+
+def get_column_values(model, values, connection, add=False):
+    obj = model(**values)
+    fields = [
+        field for field in model._meta.concrete_fields
+        if field.name in values or add and not field.primary_key
+    ]
+    return obj, [
+        (
+            connection.ops.quote_name(field.column),
+            field.get_db_prep_save(field.pre_save(obj, add), connection),
+        )
+        for field in fields
+    ]
+
+
+def insert_ignore_conflicts(model, **values):
+    using = router.db_for_write(model)
+    connection = connections[using]
+    obj, columns = get_column_values(model, values, connection, add=True)
+    pk_column = connection.ops.quote_name(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {connection.ops.quote_name(model._meta.db_table)} '
+            f'({", ".join(column for column, _ in columns)}) '
+            f'VALUES ({", ".join(["%s"] * len(columns))}) '
+            f'ON CONFLICT DO NOTHING RETURNING {pk_column}',
+            [value for _, value in columns],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    obj.pk = row[0]
+    obj._state.adding = False
+    obj._state.db = using
+    post_save.send(
+        sender=model, instance=obj, created=True,
+        update_fields=None, raw=False, using=using,
+    )
+    return obj
+
+
+def delete_returning(model, **values):
+    using = router.db_for_write(model)
+    connection = connections[using]
+    obj, columns = get_column_values(model, values, connection)
+    pk_column = connection.ops.quote_name(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)} '
+            f'WHERE {" AND ".join(f"{column} = %s" for column, _ in columns)} '
+            f'RETURNING {pk_column}',
+            [value for _, value in columns],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    obj.pk = row[0]
+    obj._state.db = using
+    post_delete.send(sender=model, instance=obj, using=using)
+    return obj
+
+
+def bulk_insert_ignore_conflicts(model, rows, returning):
+    using = router.db_for_write(model)
+    connection = connections[using]
+    rows = [
+        get_column_values(model, values, connection, add=True)[1]
+        for values in rows
+    ]
+    returning_column = connection.ops.quote_name(
+        model._meta.get_field(returning).column
+    )
+    placeholders = f'({", ".join(["%s"] * len(rows[0]))})'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {connection.ops.quote_name(model._meta.db_table)} '
+            f'({", ".join(column for column, _ in rows[0])}) '
+            f'VALUES {", ".join([placeholders] * len(rows))} '
+            f'ON CONFLICT DO NOTHING RETURNING {returning_column}',
+            [value for columns in rows for _, value in columns],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def bulk_delete_returning(model, returning, returning_values, **values):
+    using = router.db_for_write(model)
+    connection = connections[using]
+    _, columns = get_column_values(model, values, connection)
+    returning_field = model._meta.get_field(returning)
+    returning_column = connection.ops.quote_name(returning_field.column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)} '
+            f'WHERE {" AND ".join(f"{column} = %s" for column, _ in columns)} '
+            f'AND {returning_column} IN '
+            f'({", ".join(["%s"] * len(returning_values))}) '
+            f'RETURNING {returning_column}',
+            [
+                *(value for _, value in columns),
+                *(
+                    returning_field.get_db_prep_save(value, connection)
+                    for value in returning_values
+                ),
+            ],
+        )
+        return [row[0] for row in cursor.fetchall()]
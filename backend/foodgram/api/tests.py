@@ -0,0 +1,529 @@
+import base64
+import json
+import shutil
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+from threading import Barrier
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from interactions_with_recipes.models import Favorite, ShoppingList
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag, TagRecipe
+from users.models import Follow, User
+
+RECIPES_COUNT = 200
+INGREDIENTS_PER_RECIPE = 3
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@foodgram.ru',
+        password='password',
+        first_name=username,
+        last_name=username,
+    )
+
+
+def create_recipes(authors, tags, ingredients, count):
+    recipes = [
+        Recipe.objects.create(
+            author=authors[index % len(authors)],
+            name=f'Рецепт {index}',
+            text='Описание',
+            cooking_time=10,
+            image='recipes/image.png',
+        )
+        for index in range(count)
+    ]
+    IngredientRecipe.objects.bulk_create(
+        IngredientRecipe(
+            recipe=recipe,
+            ingredient=ingredients[(index + offset) % len(ingredients)],
+            amount=offset + 1,
+        )
+        for index, recipe in enumerate(recipes)
+        for offset in range(INGREDIENTS_PER_RECIPE)
+    )
+    TagRecipe.objects.bulk_create(
+        TagRecipe(recipe=recipe, tag=tags[index % len(tags)])
+        for index, recipe in enumerate(recipes)
+    )
+    return recipes
+
+
+class RecipeReadQueriesTest(TestCase):
+    LIST_QUERIES = 6
+    RETRIEVE_QUERIES = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        authors = [create_user(f'author{index}') for index in range(5)]
+        tags = [
+            Tag.objects.create(
+                name=f'Тег {index}', slug=f'tag{index}', color=f'#00000{index}'
+            )
+            for index in range(3)
+        ]
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {index}', measurement_unit='г')
+            for index in range(20)
+        )
+        ingredients = list(Ingredient.objects.all())
+        cls.recipes = create_recipes(
+            authors, tags, ingredients, RECIPES_COUNT
+        )
+        Follow.objects.create(user=cls.user, following=authors[0])
+        Favorite.objects.bulk_create(
+            Favorite(user=cls.user, recipe=recipe)
+            for recipe in cls.recipes[::2]
+        )
+        ShoppingList.objects.bulk_create(
+            ShoppingList(user=cls.user, recipe=recipe)
+            for recipe in cls.recipes[::3]
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_clients(self):
+        authorized_client = APIClient()
+        authorized_client.force_authenticate(self.user)
+        return {'anonymous': APIClient(), 'authorized': authorized_client}
+
+    def test_list_queries_do_not_depend_on_page_size(self):
+        for name, client in self.get_clients().items():
+            for page_size in (6, 50, 200):
+                with self.subTest(client=name, page_size=page_size):
+                    cache.clear()
+                    with self.assertNumQueries(self.LIST_QUERIES):
+                        response = client.get(
+                            '/api/recipes/', {'limit': page_size}
+                        )
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(
+                        len(response.json()['results']), page_size
+                    )
+
+    def test_retrieve_queries(self):
+        for name, client in self.get_clients().items():
+            for recipe in (self.recipes[0], self.recipes[-1]):
+                with self.subTest(client=name, recipe=recipe.pk):
+                    cache.clear()
+                    with self.assertNumQueries(self.RETRIEVE_QUERIES):
+                        response = client.get(f'/api/recipes/{recipe.pk}/')
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(
+                        len(response.json()['ingredients']),
+                        INGREDIENTS_PER_RECIPE,
+                    )
+
+    def test_by_ingredients(self):
+        ingredient_ids = list(
+            Ingredient.objects.order_by('pk').values_list('pk', flat=True)
+        )[:2]
+        for name, client in self.get_clients().items():
+            with self.subTest(client=name):
+                cache.clear()
+                with self.assertNumQueries(self.LIST_QUERIES):
+                    response = client.get(
+                        '/api/recipes/by-ingredients/',
+                        {
+                            'limit': 6,
+                            'ingredients': ','.join(map(str, ingredient_ids)),
+                        },
+                    )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.json()['count'],
+                    Recipe.objects.filter(
+                        ingredients__in=ingredient_ids
+                    ).distinct().count(),
+                )
+                results = response.json()['results']
+                self.assertEqual(len(results), 6)
+                self.assertEqual(
+                    [recipe['matched_ingredients'] for recipe in results],
+                    [2] * 6,
+                )
+
+
+def create_image():
+    content = BytesIO()
+    Image.new('RGB', (10, 10), 'red').save(content, 'PNG')
+    return content.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeImageTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        tag = Tag.objects.create(name='Тег', slug='tag', color='#000000')
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {index}', measurement_unit='г')
+            for index in range(INGREDIENTS_PER_RECIPE)
+        )
+        cls.recipe = create_recipes(
+            [cls.author], [tag], list(Ingredient.objects.all()), 1
+        )[0]
+        Recipe.objects.filter(pk=cls.recipe.pk).update(
+            image_thumbnail='recipes/renditions/image_image_thumbnail.webp',
+            image_card='recipes/renditions/image_image_card.webp',
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def assert_renditions_reset(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertNotEqual(recipe.image.name, self.recipe.image.name)
+        self.assertEqual(recipe.image_thumbnail.name, '')
+        self.assertEqual(recipe.image_card.name, '')
+        card = self.client.get('/api/recipes/').json()[0]['image_card']
+        self.assertTrue(card.endswith(recipe.image.url))
+
+    def test_update_image_resets_renditions(self):
+        image = base64.b64encode(create_image()).decode()
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.pk}/',
+            {'image': f'data:image/png;base64,{image}'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_renditions_reset()
+
+    def test_upload_image_resets_renditions(self):
+        response = self.client.put(
+            f'/api/recipes/{self.recipe.pk}/image/',
+            create_image(),
+            content_type='image/png',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_renditions_reset()
+
+
+class ConcurrentInteractionsTest(TransactionTestCase):
+    THREADS = 8
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest(
+                'In-memory SQLite rejects concurrent writes, '
+                'set DB_TEST_NAME to a file'
+            )
+        cache.clear()
+        self.user = create_user('reader')
+        self.author = create_user('author')
+        tag = Tag.objects.create(name='Тег', slug='tag', color='#000000')
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {index}', measurement_unit='г')
+            for index in range(INGREDIENTS_PER_RECIPE)
+        )
+        self.recipe = create_recipes(
+            [self.author], [tag], list(Ingredient.objects.all()), 1
+        )[0]
+
+    def send_concurrently(self, method, path):
+        barrier = Barrier(self.THREADS)
+
+        def send(_):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            barrier.wait()
+            try:
+                return getattr(client, method)(path).status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(self.THREADS) as executor:
+            return Counter(executor.map(send, range(self.THREADS)))
+
+    def assert_toggled_once(self, path, get_counter):
+        self.assertEqual(
+            self.send_concurrently('post', path),
+            {201: 1, 400: self.THREADS - 1},
+        )
+        self.assertEqual(get_counter(), 1)
+        self.assertEqual(
+            self.send_concurrently('delete', path),
+            {204: 1, 400: self.THREADS - 1},
+        )
+        self.assertEqual(get_counter(), 0)
+
+    def test_concurrent_favorite(self):
+        self.assert_toggled_once(
+            f'/api/recipes/{self.recipe.pk}/favorite/',
+            lambda: Recipe.objects.get(pk=self.recipe.pk).favorites_count,
+        )
+        self.assertFalse(Favorite.objects.exists())
+
+    def test_concurrent_shopping_cart(self):
+        self.assert_toggled_once(
+            f'/api/recipes/{self.recipe.pk}/shopping_cart/',
+            lambda: Recipe.objects.get(pk=self.recipe.pk).shopping_count,
+        )
+        self.assertFalse(ShoppingList.objects.exists())
+
+    def test_concurrent_subscribe(self):
+        self.assert_toggled_once(
+            f'/api/users/{self.author.pk}/subscribe/',
+            lambda: User.objects.get(pk=self.author.pk).subscribers_count,
+        )
+        self.assertFalse(Follow.objects.exists())
+
+
+class RecipeUpdateQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tags = [
+            Tag.objects.create(
+                name=f'Тег {index}', slug=f'tag{index}', color=f'#00000{index}'
+            )
+            for index in range(2)
+        ]
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {index}', measurement_unit='г')
+            for index in range(INGREDIENTS_PER_RECIPE + 1)
+        )
+        cls.ingredients = list(Ingredient.objects.order_by('pk'))
+        cls.recipe = create_recipes(
+            [cls.author], cls.tags[:1], cls.ingredients[:-1], 1
+        )[0]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def get_ingredients(self):
+        return [
+            {'id': ingredient_id, 'amount': amount}
+            for ingredient_id, amount in IngredientRecipe.objects.filter(
+                recipe=self.recipe
+            ).order_by('ingredient_id').values_list('ingredient_id', 'amount')
+        ]
+
+    def patch(self, queries, ingredients, tags):
+        with self.assertNumQueries(queries):
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.pk}/',
+                {'ingredients': ingredients, 'tags': tags},
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_ingredients(), ingredients)
+        self.assertEqual(
+            list(self.recipe.tags.values_list('pk', flat=True)), tags
+        )
+
+    def test_change_amount(self):
+        ingredients = self.get_ingredients()
+        ingredients[0]['amount'] = 50
+        self.patch(12, ingredients, [self.tags[0].pk])
+
+    def test_add_ingredient(self):
+        self.patch(
+            12,
+            [
+                *self.get_ingredients(),
+                {'id': self.ingredients[-1].pk, 'amount': 5},
+            ],
+            [self.tags[0].pk],
+        )
+
+    def test_remove_ingredient(self):
+        self.patch(13, self.get_ingredients()[:-1], [self.tags[0].pk])
+
+    def test_swap_tag(self):
+        self.patch(14, self.get_ingredients(), [self.tags[1].pk])
+
+
+class SubscriptionsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.author = create_user('author')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_invalid_recipes_limit(self):
+        for recipes_limit in ('abc', '-1'):
+            with self.subTest(recipes_limit=recipes_limit):
+                response = self.client.get(
+                    '/api/users/subscriptions/',
+                    {'limit': 6, 'recipes_limit': recipes_limit},
+                )
+                self.assertEqual(response.status_code, 400)
+                response = self.client.post(
+                    f'/api/users/{self.author.pk}/subscribe/'
+                    f'?recipes_limit={recipes_limit}'
+                )
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_empty_page_with_recipes_limit(self):
+        response = self.client.get(
+            '/api/users/subscriptions/', {'limit': 6, 'recipes_limit': 2}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
+
+
+class UploadIngredientsTest(TestCase):
+    ROWS = (
+        'соль,г\n'
+        'сахар,г\n'
+        'соль,г\n'
+        'мука,г\n'
+        'сахар,г\n'
+        ',г\n'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.create(name='мука', measurement_unit='г')
+
+    def upload(self, *args):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.csv', encoding='utf-8'
+        ) as file:
+            file.write(self.ROWS)
+            file.flush()
+            stdout = StringIO()
+            call_command(
+                'upload_ingredients', file.name, '--batch-size', '2', *args,
+                stdout=stdout,
+            )
+        return stdout.getvalue()
+
+    def test_duplicates_are_skipped(self):
+        for args, verb in ((('--dry-run',), 'Would insert'), ((), 'Inserted')):
+            with self.subTest(args=args):
+                self.assertIn(
+                    f'{verb} 2 ingredients, skipped 3 existing, '
+                    '1 invalid rows',
+                    self.upload(*args),
+                )
+        self.assertEqual(Ingredient.objects.count(), 3)
+
+
+class ImportRecipesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_user('author')
+        Tag.objects.create(name='Тег', slug='tag', color='#000000')
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+
+    def import_rows(self, rows):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.jsonl', encoding='utf-8'
+        ) as file:
+            file.writelines(f'{json.dumps(row)}\n' for row in rows)
+            file.flush()
+            stdout = StringIO()
+            call_command('import_recipes', file.name, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_malformed_rows_are_skipped(self):
+        row = {
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'author': 'author',
+            'cooking_time': 10,
+            'tags': ['tag'],
+            'ingredients': [
+                {'name': 'соль', 'measurement_unit': 'г', 'amount': 5},
+            ],
+        }
+        ingredient = row['ingredients'][0]
+        malformed_rows = [
+            {key: value for key, value in row.items() if key != 'text'},
+            {**row, 'text': None},
+            {**row, 'author': ['author']},
+            {**row, 'tags': [['tag']]},
+            {**row, 'tags': [1]},
+            {**row, 'ingredients': [{**ingredient, 'name': ['соль']}]},
+            {**row, 'ingredients': [{**ingredient, 'measurement_unit': 1}]},
+            {**row, 'image': ['recipes/image.png']},
+        ]
+        self.assertIn(
+            f'Imported 1 recipes, {len(malformed_rows)} failed',
+            self.import_rows([*malformed_rows, row]),
+        )
+        recipe = Recipe.objects.get()
+        self.assertEqual(recipe.text, 'Описание')
+        self.assertEqual(
+            list(recipe.tags.values_list('slug', flat=True)), ['tag']
+        )
+        self.assertEqual(User.objects.get(username='author').recipes_count, 1)
+
+
+class RequestInstrumentationTest(TestCase):
+    ALLOWED_IP = '127.0.0.1'
+    OTHER_IP = '10.0.0.1'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_server_timing_header(self):
+        for remote_addr, server_timing, expected in (
+            (self.ALLOWED_IP, False, True),
+            (self.OTHER_IP, False, False),
+            (self.OTHER_IP, True, True),
+        ):
+            with self.subTest(
+                remote_addr=remote_addr, server_timing=server_timing
+            ), override_settings(
+                METRICS_ALLOWED_IPS=[self.ALLOWED_IP],
+                SERVER_TIMING=server_timing,
+            ):
+                response = self.client.get(
+                    '/api/recipes/', REMOTE_ADDR=remote_addr
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.has_header('Server-Timing'), expected
+                )
+                if expected:
+                    self.assertIn('queries', response['Server-Timing'])
+
+    @override_settings(METRICS_ALLOWED_IPS=[ALLOWED_IP])
+    def test_metrics_allowlist(self):
+        self.client.get('/api/recipes/', REMOTE_ADDR=self.ALLOWED_IP)
+        response = self.client.get('/metrics', REMOTE_ADDR=self.OTHER_IP)
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get('/metrics', REMOTE_ADDR=self.ALLOWED_IP)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'http_request_duration_seconds_count{method="GET",'
+            'route="recipe-list"}',
+            response.content.decode(),
+        )
+
+    @override_settings(REQUEST_QUERY_BUDGET=0)
+    def test_budget_warning(self):
+        with self.assertLogs('api.middleware', 'WARNING') as logs:
+            self.client.get('/api/recipes/')
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('GET /api/recipes/ (recipe-list)', logs.output[0])
+        self.assertIn('queries', logs.output[0])
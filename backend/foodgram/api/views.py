@@ -1,37 +1,67 @@
-import csv
-
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.exceptions import MethodNotAllowed, ValidationError
+from rest_framework.filters import SearchFilter
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from api.filtersets import IngredientSearchFilter, RecipeFilter
-from api.pagination import CustomPageNumberPagination
+from api.counters import RECIPE_COUNTER_FIELDS, change_counter
+from api.filtersets import RecipeFilter
+from api.ingredient_index import INGREDIENTS_CACHE_NAMESPACE, ingredient_index
+from api.mixins import AnonymousResponseCacheMixin
+from api.pagination import CustomPageNumberPagination, RecipeCursorPagination
+from api.parsers import ImageUploadParser
 from api.permissions import IsAuthorOrReadOnly
+from api.querysets import (annotate_is_subscribed, attach_latest_recipes,
+                           filter_by_ingredients, get_ingredient_coverage,
+                           get_recipes_for_list, get_recipes_for_read,
+                           get_recipes_with_coverage,
+                           get_shopping_cart_ingredients, get_subscriptions)
+from api.renderers import (ShoppingCartCSVRenderer, ShoppingCartJSONRenderer,
+                           ShoppingCartTXTRenderer)
 from api.serializers import (CustomUserSerializer, IngredientSerializer,
                              RecipeCreateUpdateDestroySerializer,
+                             RecipeIdsSerializer, RecipeImageSerializer,
+                             RecipeIngredientCoverageSerializer,
                              RecipeReadSerializer, ShortRecipeReadSerializer,
                              TagSerializer, UserRecipesSerializer)
+from api.signals import invalidate_counts, invalidate_recipe_caches
+from api.statements import (bulk_delete_returning,
+                            bulk_insert_ignore_conflicts, delete_returning,
+                            insert_ignore_conflicts)
+from interactions_with_recipes.models import Favorite, ShoppingList
+from recipes.images import reset_renditions, schedule_renditions
 from recipes.models import Ingredient, Recipe, Tag
 from users.models import Follow, User
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(AnonymousResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    response_cache_namespaces = ('tags',)
+    response_cache_anonymous_only = False
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(AnonymousResponseCacheMixin,
+                        viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (IngredientSearchFilter,)
+    filter_backends = (SearchFilter,)
     search_fields = ('^name',)
+    response_cache_namespaces = (INGREDIENTS_CACHE_NAMESPACE,)
+    response_cache_anonymous_only = False
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name:
+            return Response(ingredient_index.search(name))
+        return super().list(request, *args, **kwargs)
 
 
 class CustomUserViewSet(UserViewSet):
@@ -39,12 +69,20 @@ class CustomUserViewSet(UserViewSet):
     serializer_class = CustomUserSerializer
     pagination_class = CustomPageNumberPagination
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in {'list', 'retrieve'}:
+            return annotate_is_subscribed(queryset, self.request.user)
+        return queryset
+
+    def get_count_cache_namespaces(self):
+        if self.action == 'subscriptions':
+            return (f'follows:{self.request.user.pk}',)
+        return ('users',)
+
     @action(detail=True, methods=['post', 'delete'])
     def subscribe(self, request, id=None):
         following_user = get_object_or_404(User, pk=id)
-        is_already_subscribed = request.user.subscriptions.filter(
-            following=following_user
-        )
         if request.method == 'POST':
             if following_user == request.user:
                 return Response(
@@ -52,14 +90,22 @@ class CustomUserViewSet(UserViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            if is_already_subscribed.exists():
+            recipes_limit = self.get_recipes_limit(request)
+            with transaction.atomic():
+                follow = insert_ignore_conflicts(
+                    Follow, user=request.user, following=following_user
+                )
+                if follow is not None:
+                    change_counter(
+                        User, [following_user.pk], 'subscribers_count', 1
+                    )
+            if follow is None:
                 return Response(
                     {'errors': 'A subscription with such fields '
                                '"user" "following" already exists'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-
-            Follow.objects.create(user=request.user, following=following_user)
+            attach_latest_recipes([following_user], recipes_limit)
             return Response(
                 UserRecipesSerializer(
                     following_user,
@@ -68,8 +114,15 @@ class CustomUserViewSet(UserViewSet):
                 status=status.HTTP_201_CREATED,
             )
 
-        if is_already_subscribed.exists():
-            is_already_subscribed.delete()
+        with transaction.atomic():
+            follow = delete_returning(
+                Follow, user=request.user, following=following_user
+            )
+            if follow is not None:
+                change_counter(
+                    User, [following_user.pk], 'subscribers_count', -1
+                )
+        if follow is not None:
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         return Response(
@@ -78,11 +131,27 @@ class CustomUserViewSet(UserViewSet):
             status=status.HTTP_400_BAD_REQUEST
         )
 
+    @staticmethod
+    def get_recipes_limit(request):
+        recipes_limit = request.query_params.get('recipes_limit')
+        if not recipes_limit:
+            return None
+        try:
+            recipes_limit = int(recipes_limit)
+        except ValueError:
+            recipes_limit = -1
+        if recipes_limit < 0:
+            raise ValidationError(
+                {'recipes_limit': 'recipes_limit must be a non-negative '
+                                  'integer'}
+            )
+        return recipes_limit
+
     @action(detail=False, permission_classes=(IsAuthenticated,))
     def subscriptions(self, request):
-        pages = self.paginate_queryset(
-            User.objects.filter(subscribers__user=request.user)
-        )
+        recipes_limit = self.get_recipes_limit(request)
+        pages = self.paginate_queryset(get_subscriptions(request.user))
+        attach_latest_recipes(pages, recipes_limit)
 
         return self.get_paginated_response(
             UserRecipesSerializer(
@@ -93,20 +162,72 @@ class CustomUserViewSet(UserViewSet):
         )
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AnonymousResponseCacheMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthorOrReadOnly,)
-    pagination_class = CustomPageNumberPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    response_cache_namespaces = (
+        'recipe_content', 'tags', INGREDIENTS_CACHE_NAMESPACE, 'user_profiles',
+    )
+    count_queryset = None
+
+    @property
+    def pagination_class(self):
+        cursor_query_param = RecipeCursorPagination.cursor_query_param
+        if cursor_query_param in self.request.query_params:
+            return RecipeCursorPagination
+        return CustomPageNumberPagination
+
+    def get_queryset(self):
+        if self.action == 'list':
+            return get_recipes_for_list(self.request.user)
+        if self.action == 'retrieve':
+            return get_recipes_for_read(self.request.user)
+        return super().get_queryset()
+
+    def get_count_cache_namespaces(self):
+        if self.action == 'by_ingredients':
+            return None
+        namespaces = ['recipes']
+        user = self.request.user
+        if user.is_anonymous:
+            return namespaces
+        query_params = self.request.query_params
+        if 'is_favorited' in query_params:
+            namespaces.append(f'favorites:{user.pk}')
+        if 'is_in_shopping_cart' in query_params:
+            namespaces.append(f'shopping_list:{user.pk}')
+        return namespaces
 
     def get_serializer_class(self):
         if self.action in {'list', 'retrieve'}:
             return RecipeReadSerializer
+        if self.action == 'by_ingredients':
+            return RecipeIngredientCoverageSerializer
+        if self.action == 'upload_image':
+            return RecipeImageSerializer
         return RecipeCreateUpdateDestroySerializer
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            recipe = serializer.save(author=self.request.user)
+            change_counter(User, [self.request.user.pk], 'recipes_count', 1)
+            schedule_renditions(recipe)
+        invalidate_recipe_caches()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            recipe = serializer.save()
+            if 'image' in serializer.validated_data:
+                reset_renditions(recipe)
+                schedule_renditions(recipe)
+        invalidate_recipe_caches()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            change_counter(User, [instance.author_id], 'recipes_count', -1)
 
     def update(self, request, *args, **kwargs):
         if self.action == 'update':
@@ -114,35 +235,40 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return super().update(request, *args, **kwargs)
 
     @staticmethod
-    def create_destroy_interactions_with_recipes(request, recipe_id, queryset):
+    def create_destroy_interactions_with_recipes(request, recipe_id, model):
         if request.method not in {'POST', 'DELETE'}:
             raise MethodNotAllowed(request.method)
 
         recipe = get_object_or_404(Recipe, pk=recipe_id)
-        model = queryset.model
-        interactions_obj_with_current_recipe = queryset.filter(
-            recipe=recipe,
-            user=request.user
-        )
         if request.method == 'POST':
-            if interactions_obj_with_current_recipe.exists():
+            with transaction.atomic():
+                interaction = insert_ignore_conflicts(
+                    model, user=request.user, recipe=recipe
+                )
+                if interaction is not None:
+                    change_counter(
+                        Recipe, [recipe.pk], RECIPE_COUNTER_FIELDS[model], 1
+                    )
+            if interaction is None:
                 return Response(
                     {'errors': f'{model.__name__} with the following fields '
                                f'recipe and user already exists'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-
-            model.objects.create(
-                user=request.user,
-                recipe=recipe
-            )
             return Response(
                 ShortRecipeReadSerializer(recipe).data,
                 status=status.HTTP_201_CREATED
             )
 
-        if interactions_obj_with_current_recipe.exists():
-            interactions_obj_with_current_recipe.delete()
+        with transaction.atomic():
+            interaction = delete_returning(
+                model, user=request.user, recipe=recipe
+            )
+            if interaction is not None:
+                change_counter(
+                    Recipe, [recipe.pk], RECIPE_COUNTER_FIELDS[model], -1
+                )
+        if interaction is not None:
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         return Response(
@@ -151,38 +277,192 @@ class RecipeViewSet(viewsets.ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST
         )
 
+    @staticmethod
+    def get_recipe_ids(request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return list(dict.fromkeys(serializer.validated_data['recipes']))
+
+    def bulk_create_destroy_interactions_with_recipes(self, request, model):
+        recipe_ids = self.get_recipe_ids(request)
+        found_ids = list(
+            Recipe.objects.filter(pk__in=recipe_ids).values_list(
+                'pk', flat=True
+            )
+        )
+        if request.method == 'POST':
+            statuses = self.bulk_create_interactions_with_recipes(
+                request, model, found_ids
+            )
+        else:
+            statuses = self.bulk_destroy_interactions_with_recipes(
+                request, model, found_ids
+            )
+        return Response(
+            [
+                {'id': pk, 'status': statuses.get(pk, 'not_found')}
+                for pk in recipe_ids
+            ],
+            status=(
+                status.HTTP_201_CREATED
+                if 'created' in statuses.values() else status.HTTP_200_OK
+            ),
+        )
+
+    @staticmethod
+    def bulk_create_interactions_with_recipes(request, model, recipe_ids):
+        created_ids = set()
+        if recipe_ids:
+            with transaction.atomic():
+                created_ids = set(bulk_insert_ignore_conflicts(
+                    model,
+                    [
+                        {'user': request.user, 'recipe_id': recipe_id}
+                        for recipe_id in recipe_ids
+                    ],
+                    returning='recipe',
+                ))
+                change_counter(
+                    Recipe, created_ids, RECIPE_COUNTER_FIELDS[model], 1
+                )
+        if created_ids:
+            invalidate_counts(model, model(user=request.user))
+        return {
+            recipe_id: 'created' if recipe_id in created_ids
+            else 'already_exists'
+            for recipe_id in recipe_ids
+        }
+
+    @staticmethod
+    def bulk_destroy_interactions_with_recipes(request, model, recipe_ids):
+        deleted_ids = set()
+        if recipe_ids:
+            with transaction.atomic():
+                deleted_ids = set(bulk_delete_returning(
+                    model, 'recipe', recipe_ids, user=request.user
+                ))
+                change_counter(
+                    Recipe, deleted_ids, RECIPE_COUNTER_FIELDS[model], -1
+                )
+        if deleted_ids:
+            invalidate_counts(model, model(user=request.user))
+        return {
+            recipe_id: 'deleted' if recipe_id in deleted_ids
+            else 'not_exists'
+            for recipe_id in recipe_ids
+        }
+
+    @action(detail=False, url_path='by-ingredients')
+    def by_ingredients(self, request):
+        ingredient_ids = self.get_ingredient_ids(request)
+        self.count_queryset = filter_by_ingredients(
+            self.filter_queryset(self.get_queryset()), ingredient_ids
+        )
+        coverages = get_ingredient_coverage(
+            self.count_queryset, ingredient_ids
+        )
+        page = self.paginate_queryset(coverages)
+        serializer = self.get_serializer(
+            get_recipes_with_coverage(
+                coverages if page is None else page, request.user
+            ),
+            many=True,
+        )
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    @staticmethod
+    def get_ingredient_ids(request):
+        try:
+            ingredient_ids = {
+                int(ingredient_id)
+                for value in request.query_params.getlist('ingredients')
+                for ingredient_id in value.split(',')
+                if ingredient_id
+            }
+        except ValueError:
+            raise ValidationError(
+                {'ingredients': 'Ingredient ids must be integers'}
+            )
+        if not ingredient_ids:
+            raise ValidationError(
+                {'ingredients': 'At least one ingredient id is required'}
+            )
+        return ingredient_ids
+
     @action(detail=True, methods=['post', 'delete'])
     def favorite(self, request, pk=None):
         return self.create_destroy_interactions_with_recipes(
-            request, pk, request.user.favorite_list
+            request, pk, Favorite
         )
 
     @action(detail=True, methods=['post', 'delete'])
     def shopping_cart(self, request, pk=None):
         return self.create_destroy_interactions_with_recipes(
-            request, pk, request.user.shopping_list
+            request, pk, ShoppingList
         )
 
-    @action(detail=False, permission_classes=(IsAuthenticated,))
+    @action(
+        detail=True,
+        methods=['put'],
+        url_path='image',
+        parser_classes=(MultiPartParser, ImageUploadParser),
+    )
+    def upload_image(self, request, pk=None):
+        recipe = self.get_object()
+        image = request.data.get('image', request.data.get('file'))
+        serializer = self.get_serializer(recipe, data={'image': image})
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+            reset_renditions(recipe)
+            schedule_renditions(recipe)
+        invalidate_recipe_caches()
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='favorite',
+        url_name='favorite-bulk',
+        permission_classes=(IsAuthenticated,),
+    )
+    def favorite_bulk(self, request):
+        return self.bulk_create_destroy_interactions_with_recipes(
+            request, Favorite
+        )
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk',
+        permission_classes=(IsAuthenticated,),
+    )
+    def shopping_cart_bulk(self, request):
+        return self.bulk_create_destroy_interactions_with_recipes(
+            request, ShoppingList
+        )
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(
+            ShoppingCartCSVRenderer,
+            ShoppingCartTXTRenderer,
+            ShoppingCartJSONRenderer,
+        ),
+    )
     def download_shopping_cart(self, request):
-        response = HttpResponse(content_type='text/csv')
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(
+                get_shopping_cart_ingredients(request.user).iterator()
+            ),
+            content_type=f'{renderer.media_type}; charset=utf-8',
+        )
         response['Content-Disposition'] = (
-            'attachment; filename=shoppinglist.csv'
+            f'attachment; filename=shoppinglist.{renderer.format}'
         )
-        writer = csv.writer(response)
-        for shopping_entry in request.user.shopping_list.values(
-                'recipe__ingredients__name',
-                'recipe__ingredients__measurement_unit'
-        ).annotate(amount=Sum('recipe__ingredientrecipe__amount')):
-            name = shopping_entry.get('recipe__ingredients__name')
-            amount = shopping_entry.get('amount')
-            measurement_unit = shopping_entry.get(
-                'recipe__ingredients__measurement_unit'
-            )
-
-            writer.writerow((
-                f'название: {name}',
-                f'количество: {amount}',
-                f'единицы измерения: {measurement_unit}',
-            ))
         return response
@@ -17,6 +17,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'django_filters',
     'rest_framework.authtoken',
@@ -28,6 +29,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,6 +60,47 @@ TEMPLATES = [
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+
+RESPONSE_CACHE_TIMEOUT = 300
+
+RECIPE_FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
+INGREDIENT_INDEX_TIMEOUT = 300
+
+INGREDIENT_SEARCH_LIMIT = 50
+
+BULK_INTERACTIONS_LIMIT = 100
+
+RECIPE_IMAGE_MAX_SIZE = 5 * 1024 * 1024
+
+IMAGE_RENDITION_WORKERS = 2
+
+REQUEST_QUERY_BUDGET = int(os.getenv('REQUEST_QUERY_BUDGET', default=20))
+
+REQUEST_DURATION_BUDGET = float(
+    os.getenv('REQUEST_DURATION_BUDGET', default=0.5)
+)
+
+REQUEST_BUDGET_DUPLICATED_QUERIES = 5
+
+METRICS_ALLOWED_IPS = os.getenv(
+    'METRICS_ALLOWED_IPS', default='127.0.0.1'
+).split(',')
+
+SERVER_TIMING = os.getenv('SERVER_TIMING', default='false').lower() == 'true'
+
+
 DATABASES = {
     'default': {
         'ENGINE': os.getenv('DB_ENGINE',
@@ -67,7 +110,10 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD',
                               default='postgres-password'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        'TEST': {
+            'NAME': os.getenv('DB_TEST_NAME'),
+        },
     }
 }
 
@@ -17,6 +17,11 @@ class Favorite(models.Model):
         verbose_name='рецепт',
         related_name='liked_users',
     )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='дата добавления',
+    )
 
     class Meta:
         constraints = (
@@ -44,6 +49,11 @@ class ShoppingList(models.Model):
         on_delete=models.CASCADE,
         verbose_name='рецепт'
     )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='дата добавления',
+    )
 
     class Meta:
         constraints = (
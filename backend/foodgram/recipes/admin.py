@@ -21,7 +21,7 @@ class RecipeAdmin(admin.ModelAdmin):
     readonly_fields = ('number_of_liked_users',)
 
     def number_of_liked_users(self, obj):
-        return obj.liked_users.count()
+        return obj.favorites_count
 
     number_of_liked_users.short_description = (
         'число добавлений этого рецепта в избранное'
@@ -0,0 +1,111 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from api.cache import bump_cache_version
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+RENDITION_SIZES = {
+    'image_thumbnail': (200, 200),
+    'image_card': (600, 400),
+}
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_RENDITION_WORKERS,
+    thread_name_prefix='image-renditions',
+)
+
+
+def get_rendition_format():
+    return ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg')
+
+
+def render(image, size, image_format):
+    rendition = ImageOps.fit(ImageOps.exif_transpose(image), size)
+    if image_format == 'JPEG' and rendition.mode != 'RGB':
+        rendition = rendition.convert('RGB')
+    content = BytesIO()
+    rendition.save(content, image_format, quality=80, optimize=True)
+    return content.getvalue()
+
+
+def generate_renditions(recipe, image_name=None):
+    if not recipe.image or (
+        image_name is not None and recipe.image.name != image_name
+    ):
+        return False
+    image_format, extension = get_rendition_format()
+    name = os.path.splitext(os.path.basename(recipe.image.name))[0]
+    with recipe.image.open('rb'), Image.open(recipe.image) as image:
+        image.load()
+        renditions = {
+            field: render(image, size, image_format)
+            for field, size in RENDITION_SIZES.items()
+        }
+    previous_names = [getattr(recipe, field).name for field in renditions]
+    for field, content in renditions.items():
+        getattr(recipe, field).save(
+            f'{name}_{field}.{extension}', ContentFile(content), save=False
+        )
+    names = {field: getattr(recipe, field).name for field in renditions}
+    updated = Recipe.objects.filter(
+        pk=recipe.pk, image=recipe.image.name
+    ).update(updated_at=timezone.now(), **names)
+    delete_files(
+        recipe.image.storage, previous_names if updated else names.values()
+    )
+    if not updated:
+        return False
+    bump_cache_version('recipe_content')
+    return True
+
+
+def delete_files(storage, names):
+    for name in names:
+        if name:
+            storage.delete(name)
+
+
+def reset_renditions(recipe):
+    names = [getattr(recipe, field).name for field in RENDITION_SIZES]
+    if not any(names):
+        return
+    Recipe.objects.filter(pk=recipe.pk).update(
+        **dict.fromkeys(RENDITION_SIZES, '')
+    )
+    for field in RENDITION_SIZES:
+        setattr(recipe, field, '')
+    transaction.on_commit(partial(delete_files, recipe.image.storage, names))
+
+
+def generate_renditions_for_recipe(recipe_id, image_name):
+    close_old_connections()
+    try:
+        recipe = Recipe.objects.filter(pk=recipe_id).first()
+        if recipe is not None:
+            generate_renditions(recipe, image_name)
+    except Exception:
+        logger.exception(
+            'Unable to generate image renditions for recipe %s', recipe_id
+        )
+    finally:
+        close_old_connections()
+
+
+def schedule_renditions(recipe):
+    transaction.on_commit(partial(
+        executor.submit,
+        generate_renditions_for_recipe,
+        recipe.pk,
+        recipe.image.name,
+    ))
@@ -0,0 +1,345 @@
+import json
+import time
+import tracemalloc
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from math import ceil
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from recipes.utils import PLACEHOLDER_IMAGE
+from users.models import Follow, User
+
+Scenario = namedtuple(
+    'Scenario', ('name', 'method', 'path', 'data', 'authenticated')
+)
+DUMMY_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(ceil(fraction * len(values)) - 1, 0)]
+
+
+def summarize(latencies):
+    return {
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+    }
+
+
+def get_recipe_data(ingredient):
+    return {
+        'ingredients': [{'id': ingredient.pk, 'amount': 10}],
+        'tags': list(Tag.objects.values_list('id', flat=True)[:1]),
+        'image': PLACEHOLDER_IMAGE,
+        'name': 'benchmark',
+        'text': 'benchmark',
+        'cooking_time': 10,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the API hot paths in process or, with --url, against '
+        'a running server, and compares the results with a JSON baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--username',
+            help='User making authenticated requests, by default the one '
+                 'with the most subscriptions',
+        )
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            help='Run only scenarios whose name contains the value',
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Run with a dummy cache backend',
+        )
+        parser.add_argument('--save-baseline', metavar='PATH')
+        parser.add_argument('--compare', metavar='PATH')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Allowed relative p95 latency regression',
+        )
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server to generate load against',
+        )
+        parser.add_argument('--token', help='Auth token for --url')
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=1000,
+            help='Number of requests generated with --url',
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['username'])
+        scenarios = [
+            scenario for scenario in self.get_scenarios()
+            if not options['scenario'] or any(
+                name in scenario.name for name in options['scenario']
+            )
+        ]
+        if options['url']:
+            results = self.generate_load(scenarios, options)
+        else:
+            results = self.run_in_process(scenarios, user, options)
+        for name, result in results.items():
+            self.stdout.write(f'{name:40} ' + ' '.join(
+                f'{key}={value}' for key, value in result.items()
+            ))
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+        if options['compare']:
+            self.compare(results, options['compare'], options['threshold'])
+
+    @staticmethod
+    def get_user(username):
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            follow = Follow.objects.values('user').annotate(
+                follows=Count('id')
+            ).order_by('-follows').first()
+            user = User.objects.filter(
+                pk=follow['user'] if follow else None
+            ).first() or User.objects.order_by('pk').first()
+        if user is None:
+            raise CommandError(
+                'No users found, run generate_fake_data first'
+            )
+        return user
+
+    @staticmethod
+    def get_scenarios():
+        recipe = Recipe.objects.order_by('-favorites_count').only(
+            'id', 'author_id', 'name'
+        ).first()
+        if recipe is None:
+            raise CommandError(
+                'No recipes found, run generate_fake_data first'
+            )
+        tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        ingredient = Ingredient.objects.order_by('pk').first()
+        recipe_ingredients = ','.join(
+            str(ingredient_id) for ingredient_id in
+            IngredientRecipe.objects.filter(recipe=recipe).values_list(
+                'ingredient_id', flat=True
+            )
+        ) or str(ingredient.pk)
+        list_filters = {
+            'plain': '',
+            'tags': ''.join(f'&tags={tag}' for tag in tags),
+            'author': f'&author={recipe.author_id}',
+            'is_favorited': '&is_favorited=1',
+            'is_in_shopping_cart': '&is_in_shopping_cart=1',
+            'search': f'&search={recipe.name.split()[0]}',
+            'popular': '&ordering=popular',
+            'trending': '&ordering=trending',
+            'cursor': '&cursor=',
+            'no_count': '&count=false',
+        }
+        scenarios = [
+            Scenario(
+                f'recipes_list_{name}{"_auth" if authenticated else ""}',
+                'get', f'/api/recipes/?limit=6{query}', None, authenticated,
+            )
+            for name, query in list_filters.items()
+            for authenticated in (False, True)
+            if authenticated or name not in {
+                'is_favorited', 'is_in_shopping_cart'
+            }
+        ]
+        return scenarios + [
+            Scenario('recipes_retrieve', 'get',
+                     f'/api/recipes/{recipe.pk}/', None, False),
+            Scenario('recipes_retrieve_auth', 'get',
+                     f'/api/recipes/{recipe.pk}/', None, True),
+            Scenario('recipes_by_ingredients', 'get',
+                     f'/api/recipes/by-ingredients/?limit=6'
+                     f'&ingredients={recipe_ingredients}', None, False),
+            Scenario('recipes_by_ingredients_auth', 'get',
+                     f'/api/recipes/by-ingredients/?limit=6'
+                     f'&ingredients={recipe_ingredients}', None, True),
+            Scenario('ingredients_search', 'get',
+                     f'/api/ingredients/?name={ingredient.name[:2]}',
+                     None, False),
+            Scenario('users_subscriptions', 'get',
+                     '/api/users/subscriptions/?limit=6&recipes_limit=3',
+                     None, True),
+            Scenario('download_shopping_cart', 'get',
+                     '/api/recipes/download_shopping_cart/', None, True),
+            Scenario('recipes_create', 'post', '/api/recipes/',
+                     get_recipe_data(ingredient), True),
+            Scenario('recipes_patch', 'patch', '/api/recipes/{own_recipe}/',
+                     {'cooking_time': 20}, True),
+        ]
+
+    def run_in_process(self, scenarios, user, options):
+        results = {}
+        caches = DUMMY_CACHES if options['no_cache'] else settings.CACHES
+        last_recipe = Recipe.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            CACHES=caches,
+        ), transaction.atomic():
+            clients = {False: APIClient(), True: APIClient()}
+            clients[True].force_authenticate(user)
+            self.send(clients[True], Scenario(
+                'recipes_create', 'post', '/api/recipes/',
+                get_recipe_data(Ingredient.objects.first()), True,
+            ))
+            own_recipe = Recipe.objects.filter(
+                pk__gt=last_recipe, author=user
+            ).values_list('pk', flat=True).first()
+            for scenario in scenarios:
+                results[scenario.name] = self.measure(
+                    clients[scenario.authenticated],
+                    scenario._replace(
+                        path=scenario.path.format(own_recipe=own_recipe)
+                    ),
+                    options,
+                )
+            for image in Recipe.objects.filter(
+                pk__gt=last_recipe
+            ).values_list('image', flat=True):
+                default_storage.delete(image)
+            transaction.set_rollback(True)
+        return results
+
+    @staticmethod
+    def send(client, scenario):
+        if scenario.data is None:
+            response = getattr(client, scenario.method)(scenario.path)
+        else:
+            response = getattr(client, scenario.method)(
+                scenario.path, scenario.data, format='json'
+            )
+        if response.streaming:
+            b''.join(response.streaming_content)
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{scenario.name} failed with {response.status_code}'
+            )
+        return response
+
+    def measure(self, client, scenario, options):
+        for _ in range(options['warmup']):
+            self.send(client, scenario)
+        latencies = []
+        queries = []
+        for _ in range(options['iterations']):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                self.send(client, scenario)
+                latencies.append(time.perf_counter() - started)
+            queries.append(len(context.captured_queries))
+        tracemalloc.start()
+        self.send(client, scenario)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {
+            **summarize(latencies),
+            'queries': percentile(queries, 0.5),
+            'peak_kib': round(peak / 1024, 1),
+        }
+
+    @staticmethod
+    def generate_load(scenarios, options):
+        scenarios = [
+            scenario for scenario in scenarios
+            if scenario.method == 'get'
+            and (options['token'] or not scenario.authenticated)
+        ]
+        base_url = options['url'].rstrip('/')
+        headers = (
+            {'Authorization': f'Token {options["token"]}'}
+            if options['token'] else {}
+        )
+
+        def send(number):
+            scenario = scenarios[number % len(scenarios)]
+            started = time.perf_counter()
+            try:
+                with urlopen(
+                    Request(base_url + scenario.path, headers=headers),
+                    timeout=30,
+                ) as response:
+                    response.read()
+            except (HTTPError, URLError, OSError):
+                return scenario.name, time.perf_counter() - started, False
+            return scenario.name, time.perf_counter() - started, True
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            samples = list(executor.map(send, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        results = {}
+        for scenario in scenarios:
+            latencies = [
+                latency for name, latency, _ in samples
+                if name == scenario.name
+            ]
+            if latencies:
+                results[scenario.name] = {
+                    **summarize(latencies),
+                    'errors': sum(
+                        not ok for name, _, ok in samples
+                        if name == scenario.name
+                    ),
+                    'rps': round(len(latencies) / elapsed, 1),
+                }
+        return results
+
+    def compare(self, results, path, threshold):
+        with open(path) as file:
+            baseline = json.load(file)
+        regressions = []
+        for name, result in results.items():
+            expected = baseline.get(name)
+            if expected is None:
+                continue
+            if result.get('queries', 0) > expected.get('queries', 0):
+                regressions.append(
+                    f'{name}: {expected["queries"]} -> '
+                    f'{result["queries"]} queries'
+                )
+            if result['p95_ms'] > expected['p95_ms'] * (1 + threshold):
+                regressions.append(
+                    f'{name}: p95 {expected["p95_ms"]} -> '
+                    f'{result["p95_ms"]} ms'
+                )
+        if regressions:
+            raise CommandError(
+                'Regressions against the baseline:\n'
+                + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS(
+            'No regressions against the baseline'
+        ))
@@ -0,0 +1,109 @@
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.views import RecipeViewSet
+from recipes.images import RENDITION_SIZES, delete_files, executor
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.utils import PLACEHOLDER_IMAGE
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures how many recipes per second the recipe create endpoint '
+        'can write for the given numbers of ingredients'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ingredients',
+            type=int,
+            nargs='+',
+            default=[10, 50],
+            help='Numbers of ingredients per recipe to benchmark',
+        )
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=100,
+            help='Number of recipes created for every run',
+        )
+
+    def handle(self, *args, **options):
+        ingredient_ids = list(Ingredient.objects.values_list(
+            'id', flat=True
+        )[:max(options['ingredients'])])
+        if len(ingredient_ids) < max(options['ingredients']):
+            raise CommandError(
+                f'At least {max(options["ingredients"])} ingredients '
+                f'are required, found {len(ingredient_ids)}'
+            )
+        tag_ids = list(Tag.objects.values_list('id', flat=True)[:3])
+        user = User.objects.create_user(
+            username=f'benchmark-{uuid4().hex[:8]}',
+            email=f'benchmark-{uuid4().hex[:8]}@example.com',
+            first_name='benchmark',
+            last_name='benchmark',
+        )
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            ):
+                self.run_all(user, ingredient_ids, tag_ids, options)
+        finally:
+            self.clean_up(user)
+
+    def run_all(self, user, ingredient_ids, tag_ids, options):
+        for ingredients in options['ingredients']:
+            elapsed = self.run(
+                user, ingredient_ids[:ingredients], tag_ids,
+                options['recipes'],
+            )
+            self.stdout.write(
+                f'{ingredients} ingredients: '
+                f'{options["recipes"] / elapsed:.1f} recipes/s '
+                f'({elapsed * 1000 / options["recipes"]:.2f} ms/recipe)'
+            )
+
+    @staticmethod
+    def run(user, ingredient_ids, tag_ids, recipes):
+        view = RecipeViewSet.as_view({'post': 'create'})
+        factory = APIRequestFactory()
+        data = {
+            'ingredients': [
+                {'id': ingredient_id, 'amount': 1}
+                for ingredient_id in ingredient_ids
+            ],
+            'tags': tag_ids,
+            'image': PLACEHOLDER_IMAGE,
+            'name': 'benchmark',
+            'text': 'benchmark',
+            'cooking_time': 1,
+        }
+        elapsed = 0
+        for _ in range(recipes):
+            request = factory.post('/api/recipes/', data, format='json')
+            force_authenticate(request, user)
+            started = time.perf_counter()
+            response = view(request)
+            elapsed += time.perf_counter() - started
+            if response.status_code != 201:
+                raise CommandError(f'Recipe was not created: {response.data}')
+        return elapsed
+
+    @staticmethod
+    def clean_up(user):
+        executor.shutdown(wait=True)
+        images = Recipe.objects.filter(author=user).values_list(
+            'image', *RENDITION_SIZES
+        )
+        delete_files(
+            default_storage, [name for names in images for name in names]
+        )
+        user.delete()
@@ -0,0 +1,75 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+
+from recipes.models import IngredientRecipe, Recipe
+
+
+def serialize_recipe(recipe):
+    return {
+        'author': recipe.author.username,
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'image': recipe.image.name or None,
+        'pub_date': recipe.pub_date.isoformat(),
+        'tags': [tag.slug for tag in recipe.tags.all()],
+        'ingredients': [
+            {
+                'name': ingredient_recipe.ingredient.name,
+                'measurement_unit': (
+                    ingredient_recipe.ingredient.measurement_unit
+                ),
+                'amount': ingredient_recipe.amount,
+            }
+            for ingredient_recipe in recipe.ingredientrecipe_set.all()
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Exports recipes to a JSON lines file, one recipe per line'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default='-',
+            help='Path to the output file, "-" for the standard output',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            exported = self.export(sys.stdout, options['batch_size'])
+        else:
+            with open(options['path'], 'w', encoding='utf-8') as file:
+                exported = self.export(file, options['batch_size'])
+        self.stderr.write(self.style.SUCCESS(f'Exported {exported} recipes'))
+
+    @staticmethod
+    def export(file, batch_size):
+        recipes = Recipe.objects.defer('search_vector').select_related(
+            'author'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredientrecipe_set',
+                queryset=IngredientRecipe.objects.select_related('ingredient'),
+            ),
+        ).order_by('pk')
+        exported = 0
+        last_pk = 0
+        while True:
+            batch = list(recipes.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return exported
+            for recipe in batch:
+                file.write(
+                    json.dumps(serialize_recipe(recipe), ensure_ascii=False)
+                )
+                file.write('\n')
+            exported += len(batch)
+            last_pk = batch[-1].pk
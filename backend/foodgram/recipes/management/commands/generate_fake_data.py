@@ -0,0 +1,222 @@
+import random
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.cache import bump_cache_version
+from api.signals import invalidate_recipe_caches
+from interactions_with_recipes.models import Favorite, ShoppingList
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag, TagRecipe
+from recipes.utils import override_auto_now_add
+from users.models import Follow, User
+
+PUBLICATION_PERIOD = timedelta(days=365)
+INTERACTION_PERIOD = timedelta(days=30)
+
+
+def get_cum_weights(count, exponent):
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+def sample(rng, population, cum_weights, k):
+    k = min(k, len(population))
+    chosen = set()
+    for _ in range(10):
+        if len(chosen) >= k:
+            break
+        chosen.update(rng.choices(
+            population, cum_weights=cum_weights, k=k - len(chosen)
+        ))
+    return chosen
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates a reproducible dataset of users, recipes, favorites, '
+        'shopping lists and subscriptions with power-law popularity'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--tags-per-recipe', type=int, default=2)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument('--follows-per-user', type=int, default=10)
+        parser.add_argument(
+            '--exponent',
+            type=float,
+            default=1.1,
+            help='Exponent of the power-law popularity distribution',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--prefix',
+            default='fake',
+            help='Prefix of the generated usernames',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if not ingredient_ids:
+            raise CommandError(
+                'There are no ingredients, run upload_ingredients first'
+            )
+        if User.objects.filter(
+            username__startswith=f'{options["prefix"]}-'
+        ).exists():
+            raise CommandError(
+                f'Users with the prefix {options["prefix"]} already exist'
+            )
+        with override_auto_now_add(
+            Recipe._meta.get_field('pub_date'),
+            Favorite._meta.get_field('created_at'),
+            ShoppingList._meta.get_field('created_at'),
+        ):
+            user_ids = self.create_users()
+            recipe_ids = self.create_recipes(user_ids)
+            self.create_recipe_rows(
+                recipe_ids,
+                ingredient_ids,
+                list(Tag.objects.values_list('id', flat=True)),
+            )
+            self.create_interactions(Favorite, user_ids, recipe_ids)
+            self.create_interactions(ShoppingList, user_ids, recipe_ids)
+            self.create_follows(user_ids)
+        call_command('recount_counters', stdout=self.stdout)
+        invalidate_recipe_caches()
+        bump_cache_version('users')
+        bump_cache_version('user_profiles')
+
+    def bulk_create(self, model, objs):
+        created = 0
+        objs = iter(objs)
+        while True:
+            batch = list(islice(objs, self.options['batch_size']))
+            if not batch:
+                break
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            created += len(batch)
+        self.stdout.write(
+            f'{model._meta.verbose_name_plural}: {created} created'
+        )
+
+    def shuffled(self, population):
+        population = list(population)
+        self.rng.shuffle(population)
+        return population
+
+    def get_activity(self, mean):
+        return int(self.rng.expovariate(1 / mean)) if mean > 0 else 0
+
+    def create_users(self):
+        prefix = self.options['prefix']
+        password = make_password('password')
+        self.bulk_create(User, (
+            User(
+                username=f'{prefix}-{number}',
+                email=f'{prefix}-{number}@example.com',
+                first_name=f'Имя {number}',
+                last_name=f'Фамилия {number}',
+                password=password,
+            )
+            for number in range(self.options['users'])
+        ))
+        return self.shuffled(User.objects.filter(
+            username__startswith=f'{prefix}-'
+        ).order_by('pk').values_list('id', flat=True))
+
+    def create_recipes(self, user_ids):
+        cum_weights = get_cum_weights(len(user_ids), self.options['exponent'])
+        authors = self.rng.choices(
+            user_ids, cum_weights=cum_weights, k=self.options['recipes']
+        )
+        period = PUBLICATION_PERIOD.total_seconds()
+        self.bulk_create(Recipe, (
+            Recipe(
+                author_id=author_id,
+                name=f'Рецепт {number}',
+                text=f'Описание рецепта {number}',
+                cooking_time=self.rng.randint(1, 180),
+                pub_date=self.now - timedelta(
+                    seconds=self.rng.uniform(0, period)
+                ),
+            )
+            for number, author_id in enumerate(authors)
+        ))
+        return self.shuffled(Recipe.objects.filter(
+            author_id__in=set(authors)
+        ).order_by('pk').values_list('id', flat=True))
+
+    def create_recipe_rows(self, recipe_ids, ingredient_ids, tag_ids):
+        ingredient_weights = get_cum_weights(
+            len(ingredient_ids), self.options['exponent']
+        )
+        self.bulk_create(IngredientRecipe, (
+            IngredientRecipe(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=self.rng.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in sample(
+                self.rng,
+                ingredient_ids,
+                ingredient_weights,
+                self.options['ingredients_per_recipe'],
+            )
+        ))
+        self.bulk_create(TagRecipe, (
+            TagRecipe(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.rng.sample(
+                tag_ids, min(self.options['tags_per_recipe'], len(tag_ids))
+            )
+        ))
+
+    def create_interactions(self, model, user_ids, recipe_ids):
+        mean = self.options[
+            'favorites_per_user' if model is Favorite else 'cart_per_user'
+        ]
+        cum_weights = get_cum_weights(
+            len(recipe_ids), self.options['exponent']
+        )
+        period = INTERACTION_PERIOD.total_seconds()
+        self.bulk_create(model, (
+            model(
+                user_id=user_id,
+                recipe_id=recipe_id,
+                created_at=self.now - timedelta(
+                    seconds=self.rng.uniform(0, period)
+                ),
+            )
+            for user_id in user_ids
+            for recipe_id in sample(
+                self.rng, recipe_ids, cum_weights, self.get_activity(mean)
+            )
+        ))
+
+    def create_follows(self, user_ids):
+        cum_weights = get_cum_weights(len(user_ids), self.options['exponent'])
+        self.bulk_create(Follow, (
+            Follow(user_id=user_id, following_id=following_id)
+            for user_id in user_ids
+            for following_id in sample(
+                self.rng,
+                user_ids,
+                cum_weights,
+                self.get_activity(self.options['follows_per_user']),
+            )
+            if following_id != user_id
+        ))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from recipes.images import generate_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Generates thumbnail and card renditions of recipe images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Regenerate renditions that already exist',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(
+            Q(image='') | Q(image__isnull=True)
+        ).defer('search_vector')
+        if not options['all']:
+            recipes = recipes.filter(
+                Q(image_thumbnail='') | Q(image_card='')
+            )
+        generated = failed = 0
+        for recipe in recipes.iterator():
+            try:
+                generate_renditions(recipe)
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stderr.write(self.style.WARNING(
+                    f'Recipe {recipe.pk} skipped: {error}'
+                ))
+            else:
+                generated += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Renditions generated for {generated} recipes, {failed} failed'
+        ))
@@ -0,0 +1,246 @@
+import json
+import multiprocessing
+import os
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api.counters import change_counter
+from api.signals import invalidate_recipe_caches
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag, TagRecipe
+from recipes.utils import override_auto_now_add
+from users.models import User
+
+NAME_MAX_LENGTH = Recipe._meta.get_field('name').max_length
+IMAGE_MAX_LENGTH = Recipe._meta.get_field('image').max_length
+SMALLINT_MAX = 32767
+
+
+def get_ranges(path, workers):
+    size = os.path.getsize(path)
+    offsets = [0]
+    with open(path, 'rb') as file:
+        for worker in range(1, workers):
+            file.seek(max(size * worker // workers, offsets[-1]))
+            file.readline()
+            offsets.append(file.tell())
+    offsets.append(size)
+    return [
+        (start, end) for start, end in zip(offsets, offsets[1:]) if start < end
+    ]
+
+
+def read_range(path, start, end):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while file.tell() < end:
+            line = file.readline()
+            if line.strip():
+                yield line
+
+
+def parse_row(line):
+    row = json.loads(line)
+    row['cooking_time'] = int(row['cooking_time'])
+    row['ingredients'] = [
+        (
+            ingredient['name'],
+            ingredient['measurement_unit'],
+            int(ingredient['amount']),
+        )
+        for ingredient in row['ingredients']
+    ]
+    row['tags'] = list(dict.fromkeys(row.get('tags', ())))
+    row['pub_date'] = parse_datetime(row.get('pub_date') or '')
+    if not is_valid(row):
+        raise ValueError
+    return row
+
+
+def is_valid(row):
+    ingredients = {
+        (name, measurement_unit)
+        for name, measurement_unit, _ in row['ingredients']
+    }
+    return (
+        all(
+            isinstance(row.get(field), str)
+            for field in ('name', 'text', 'author')
+        )
+        and isinstance(row.get('image') or '', str)
+        and all(isinstance(slug, str) for slug in row['tags'])
+        and all(
+            isinstance(name, str) and isinstance(measurement_unit, str)
+            for name, measurement_unit in ingredients
+        )
+        and 0 < len(row['name']) <= NAME_MAX_LENGTH
+        and len(row.get('image') or '') <= IMAGE_MAX_LENGTH
+        and 0 < row['cooking_time'] <= SMALLINT_MAX
+        and all(
+            0 < amount <= SMALLINT_MAX for _, _, amount in row['ingredients']
+        )
+        and len(ingredients) == len(row['ingredients'])
+    )
+
+
+def parse_rows(lines):
+    rows = []
+    failed = 0
+    for line in lines:
+        try:
+            rows.append(parse_row(line))
+        except (KeyError, TypeError, ValueError):
+            failed += 1
+    return rows, failed
+
+
+def get_related_objects(rows):
+    authors = dict(User.objects.filter(
+        username__in={row['author'] for row in rows}
+    ).values_list('username', 'id'))
+    tags = dict(Tag.objects.filter(
+        slug__in={slug for row in rows for slug in row['tags']}
+    ).values_list('slug', 'id'))
+    ingredients = {
+        (name, measurement_unit): pk
+        for pk, name, measurement_unit in Ingredient.objects.filter(
+            name__in={
+                name for row in rows for name, _, _ in row['ingredients']
+            }
+        ).values_list('id', 'name', 'measurement_unit')
+    }
+    return authors, tags, ingredients
+
+
+def is_resolved(row, authors, tags, ingredients):
+    return (
+        row['author'] in authors
+        and all(slug in tags for slug in row['tags'])
+        and all(
+            (name, measurement_unit) in ingredients
+            for name, measurement_unit, _ in row['ingredients']
+        )
+    )
+
+
+def create_recipes(recipes):
+    if connection.features.can_return_ids_from_bulk_insert:
+        return Recipe.objects.bulk_create(recipes)
+    for recipe in recipes:
+        recipe.save(force_insert=True)
+    return recipes
+
+
+def import_rows(rows):
+    authors, tags, ingredients = get_related_objects(rows)
+    resolved_rows = [
+        row for row in rows if is_resolved(row, authors, tags, ingredients)
+    ]
+    recipes = [
+        Recipe(
+            author_id=authors[row['author']],
+            name=row['name'],
+            text=row['text'],
+            cooking_time=row['cooking_time'],
+            image=row.get('image'),
+            pub_date=row['pub_date'] or timezone.now(),
+        )
+        for row in resolved_rows
+    ]
+    with transaction.atomic():
+        with override_auto_now_add(Recipe._meta.get_field('pub_date')):
+            create_recipes(recipes)
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                recipe=recipe,
+                ingredient_id=ingredients[name, measurement_unit],
+                amount=amount,
+            )
+            for recipe, row in zip(recipes, resolved_rows)
+            for name, measurement_unit, amount in row['ingredients']
+        )
+        TagRecipe.objects.bulk_create(
+            TagRecipe(recipe=recipe, tag_id=tags[slug])
+            for recipe, row in zip(recipes, resolved_rows)
+            for slug in row['tags']
+        )
+        update_recipes_counts(recipes)
+    return len(recipes), len(rows) - len(resolved_rows)
+
+
+def update_recipes_counts(recipes):
+    authors_by_count = defaultdict(list)
+    for author_id, count in Counter(
+        recipe.author_id for recipe in recipes
+    ).items():
+        authors_by_count[count].append(author_id)
+    for count, author_ids in authors_by_count.items():
+        change_counter(User, author_ids, 'recipes_count', count)
+
+
+def import_range(path, start, end, batch_size):
+    imported = failed = 0
+    lines = read_range(path, start, end)
+    while True:
+        batch = list(islice(lines, batch_size))
+        if not batch:
+            return imported, failed
+        rows, invalid = parse_rows(batch)
+        batch_imported, unresolved = import_rows(rows) if rows else (0, 0)
+        imported += batch_imported
+        failed += invalid + unresolved
+
+
+def import_range_in_worker(*args):
+    try:
+        return import_range(*args)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports recipes from a JSON lines file created by export_recipes. '
+        'Authors, tags and ingredients must already exist'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to a JSON lines file')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of processes the file is split across',
+        )
+
+    def handle(self, *args, **options):
+        if not os.path.isfile(options['path']):
+            raise CommandError(f'File {options["path"]} does not exist')
+        arguments = [
+            (options['path'], start, end, options['batch_size'])
+            for start, end in get_ranges(
+                options['path'], max(options['workers'], 1)
+            )
+        ]
+        if options['workers'] > 1:
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=options['workers'],
+                mp_context=multiprocessing.get_context('fork'),
+            ) as executor:
+                results = list(
+                    executor.map(import_range_in_worker, *zip(*arguments))
+                )
+        else:
+            results = [import_range(*argument) for argument in arguments]
+        invalidate_recipe_caches()
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {sum(imported for imported, _ in results)} recipes, '
+            f'{sum(failed for _, failed in results)} failed'
+        ))
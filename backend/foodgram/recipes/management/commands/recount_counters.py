@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from interactions_with_recipes.models import Favorite, ShoppingList
+from recipes.models import Recipe
+from users.models import Follow, User
+
+
+def count_related(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                count=Count('pk')
+            ).values('count')
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Recalculates denormalized recipe and user counters'
+
+    def handle(self, *args, **kwargs):
+        with transaction.atomic():
+            recipes = Recipe.objects.update(
+                favorites_count=count_related(Favorite, 'recipe'),
+                shopping_count=count_related(ShoppingList, 'recipe'),
+            )
+            users = User.objects.update(
+                recipes_count=count_related(Recipe, 'author'),
+                subscribers_count=count_related(Follow, 'following'),
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Counters recalculated for {recipes} recipes and {users} users'
+        ))
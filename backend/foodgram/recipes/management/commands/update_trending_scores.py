@@ -0,0 +1,74 @@
+from datetime import timedelta
+from math import exp, log
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from api.cache import bump_cache_version
+from interactions_with_recipes.models import Favorite, ShoppingList
+from recipes.models import Recipe
+
+SECONDS_IN_HOUR = 3600
+
+
+def get_hourly_events(model, since):
+    return model.objects.filter(
+        created_at__gte=since
+    ).annotate(
+        hour=Trunc('created_at', 'hour')
+    ).order_by().values('recipe', 'hour').annotate(
+        events=Count('pk')
+    ).values_list('recipe', 'hour', 'events')
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalculates the time-decayed trending score of recipes '
+        'from recent favorites and shopping list additions'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--half-life',
+            type=float,
+            default=24,
+            help='Score half-life in hours',
+        )
+        parser.add_argument(
+            '--window',
+            type=int,
+            default=7,
+            help='Number of days of interactions taken into account',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        since = now - timedelta(days=options['window'])
+        decay = log(2) / (options['half_life'] * SECONDS_IN_HOUR)
+        scores = {}
+        for model in (Favorite, ShoppingList):
+            for recipe, hour, events in get_hourly_events(model, since):
+                age = max((now - hour).total_seconds(), 0)
+                scores[recipe] = (
+                    scores.get(recipe, 0) + events * exp(-decay * age)
+                )
+        recipes = [
+            Recipe(pk=pk, trending_score=score)
+            for pk, score in scores.items()
+        ]
+        with transaction.atomic():
+            reset = Recipe.objects.filter(trending_score__gt=0).exclude(
+                pk__in=scores.keys()
+            ).update(trending_score=0)
+            Recipe.objects.bulk_update(
+                recipes, ('trending_score',), options['batch_size']
+            )
+        bump_cache_version('recipe_content')
+        self.stdout.write(self.style.SUCCESS(
+            f'Trending scores updated for {len(recipes)} recipes, '
+            f'{reset} reset'
+        ))
@@ -1,40 +1,146 @@
 import csv
+import json
 import os
+from itertools import islice
 
-from django.core.management.base import BaseCommand
-from django.db import IntegrityError
+from django.core.management.base import BaseCommand, CommandError
 
-from recipes.models import Ingredient
+from api.cache import bump_cache_version
+from api.ingredient_index import INGREDIENTS_CACHE_NAMESPACE
+from recipes.models import DEFAULT_FIELD_MAX_LENGTH, Ingredient
 
 PATH_TO_INGREDIENTS = os.path.join(
     os.path.dirname(os.path.abspath(__file__)),
     'data',
     'ingredients.csv',
 )
+JSON_READ_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    reader = csv.DictReader(
+        file,
+        delimiter=',',
+        fieldnames=('name', 'measurement_unit')
+    )
+    for row in reader:
+        yield row.get('name'), row.get('measurement_unit')
+
+
+def read_json(file):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,[]':
+            position += 1
+        try:
+            row, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                if buffer[position:].strip():
+                    raise CommandError('Unable to parse ingredients JSON')
+                return
+            chunk = file.read(JSON_READ_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield row.get('name'), row.get('measurement_unit')
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+    '.jsonl': read_json,
+}
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def is_valid(name, measurement_unit):
+    return (
+        name and measurement_unit
+        and len(name) <= DEFAULT_FIELD_MAX_LENGTH
+        and len(measurement_unit) <= DEFAULT_FIELD_MAX_LENGTH
+    )
 
 
 class Command(BaseCommand):
-    help = 'Adds ingredients to the database'
-
-    def handle(self, *args, **kwargs):
-        with open(PATH_TO_INGREDIENTS, newline='',
-                  encoding='utf-8') as csvfile:
-            reader = csv.DictReader(
-                csvfile,
-                delimiter=',',
-                fieldnames=('name', 'measurement_unit')
-            )
-            objs = (
-                Ingredient(
-                    name=row.get('name'),
-                    measurement_unit=row.get('measurement_unit')
-                ) for row in reader
+    help = (
+        'Adds ingredients from a CSV or JSON file to the database, '
+        'skipping the ones that already exist'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=PATH_TO_INGREDIENTS,
+            help='Path to a .csv, .json or .jsonl file with ingredients',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the changes without writing them',
+        )
+
+    def handle(self, *args, **options):
+        reader = READERS.get(os.path.splitext(options['path'])[1].lower())
+        if reader is None:
+            raise CommandError(
+                'Only .csv, .json and .jsonl files are supported'
             )
-            try:
-                Ingredient.objects.bulk_create(objs)
-            except IntegrityError as e:
-                self.stderr.write(self.style.WARNING(
-                    f'Creation skipped. Unable to create objects. {e}'))
+        counts = {'inserted': 0, 'skipped': 0, 'invalid': 0}
+        counted = set()
+        with open(options['path'], newline='', encoding='utf-8') as file:
+            for rows in chunked(reader(file), options['batch_size']):
+                self.upload(rows, counts, counted, options['dry_run'])
+        if counts['inserted'] and not options['dry_run']:
+            bump_cache_version(INGREDIENTS_CACHE_NAMESPACE)
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Would insert" if options["dry_run"] else "Inserted"} '
+            f'{counts["inserted"]} ingredients, '
+            f'skipped {counts["skipped"]} existing, '
+            f'{counts["invalid"]} invalid rows'
+        ))
+
+    @staticmethod
+    def upload(rows, counts, counted, dry_run):
+        ingredients = {}
+        for name, measurement_unit in rows:
+            name = (name or '').strip()
+            measurement_unit = (measurement_unit or '').strip()
+            key = name, measurement_unit
+            if not is_valid(name, measurement_unit):
+                counts['invalid'] += 1
+            elif key in ingredients or key in counted:
+                counts['skipped'] += 1
             else:
-                self.stdout.write(self.style.SUCCESS(
-                    'Ingredients added successfully'))
+                ingredients[key] = Ingredient(
+                    name=name, measurement_unit=measurement_unit
+                )
+        existing = set(Ingredient.objects.filter(
+            name__in={name for name, _ in ingredients}
+        ).values_list('name', 'measurement_unit'))
+        new_ingredients = {
+            key: ingredient for key, ingredient in ingredients.items()
+            if key not in existing
+        }
+        counts['inserted'] += len(new_ingredients)
+        counts['skipped'] += len(ingredients) - len(new_ingredients)
+        if dry_run:
+            counted.update(new_ingredients)
+        else:
+            Ingredient.objects.bulk_create(
+                new_ingredients.values(), ignore_conflicts=True
+            )
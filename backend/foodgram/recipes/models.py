@@ -1,8 +1,9 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 
 from recipes.validators import color_hex_validator
-from users.models import User
+from users.models import DenormalizedFieldsMixin, User
 
 DEFAULT_FIELD_MAX_LENGTH = 200
 MAX_COLOR_FIELD_LENGTH = 7
@@ -59,7 +60,7 @@ class Ingredient(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class Recipe(DenormalizedFieldsMixin, models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -82,11 +83,42 @@ class Recipe(models.Model):
         null=True,
         verbose_name='картинка',
     )
+    image_thumbnail = models.ImageField(
+        upload_to='recipes/renditions/',
+        blank=True,
+        editable=False,
+        verbose_name='миниатюра картинки',
+    )
+    image_card = models.ImageField(
+        upload_to='recipes/renditions/',
+        blank=True,
+        editable=False,
+        verbose_name='картинка для карточки',
+    )
     pub_date = models.DateTimeField(
         auto_now_add=True,
         verbose_name='дата публикации',
         db_index=True
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='дата изменения',
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='число добавлений в избранное',
+    )
+    shopping_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='число добавлений в список покупок',
+    )
+    trending_score = models.FloatField(
+        default=0,
+        editable=False,
+        verbose_name='рейтинг популярности за последнее время',
+    )
     ingredients = models.ManyToManyField(
         Ingredient,
         through='IngredientRecipe',
@@ -95,9 +127,29 @@ class Recipe(models.Model):
         Tag,
         through='TagRecipe',
     )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='поисковый вектор',
+    )
+
+    denormalized_fields = (
+        'favorites_count', 'shopping_count', 'trending_score',
+        'image_thumbnail', 'image_card',
+    )
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('-favorites_count', '-pub_date'),
+                name='recipe_popular_idx',
+            ),
+            models.Index(
+                fields=('-trending_score', '-pub_date'),
+                name='recipe_trending_idx',
+            ),
+        )
         verbose_name = 'рецепт'
         verbose_name_plural = 'рецепты'
 
@@ -4,7 +4,22 @@ from django.db import models
 USER_FIELD_MAX_LENGTH = 150
 
 
-class User(AbstractUser):
+class DenormalizedFieldsMixin:
+    denormalized_fields = ()
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields is None and not self._state.adding:
+            deferred_fields = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.denormalized_fields
+                and field.attname not in deferred_fields
+            ]
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+
+class User(DenormalizedFieldsMixin, AbstractUser):
     first_name = models.CharField(
         max_length=USER_FIELD_MAX_LENGTH,
         blank=False,
@@ -16,7 +31,16 @@ class User(AbstractUser):
     email = models.EmailField(
         unique=True,
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='число рецептов',
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='число подписчиков',
+    )
     REQUIRED_FIELDS = ('first_name', 'last_name', 'email')
+    denormalized_fields = ('recipes_count', 'subscribers_count')
 
 
 class Follow(models.Model):